@@ -5,16 +5,24 @@ BedrockAgentCoreAppを使用してAgentCore Runtimeで実行されるサーバ
 """
 
 import asyncio
+import concurrent.futures
 import contextvars
 import json
 import logging
 import os
 import sys
+import time
+from collections.abc import Callable
 from typing import Any
 
 import boto3
+import requests
 from bedrock_agentcore import BedrockAgentCoreApp, RequestContext
 from bedrock_agentcore.identity.auth import requires_access_token
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
 
 # Context variable for user_id (for AgentCore Identity SDK)
 current_user_id: contextvars.ContextVar[str] = contextvars.ContextVar('current_user_id', default='default-user')
@@ -24,7 +32,7 @@ auth_url_storage: list[str] = []
 
 # ログ設定 - 標準出力に明示的に出力
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO"),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     handlers=[logging.StreamHandler(sys.stdout)]
 )
@@ -35,14 +43,167 @@ app = BedrockAgentCoreApp()
 
 # AWS クライアント
 AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-bedrock_agentcore = boto3.client("bedrock-agentcore", region_name=AWS_REGION)
 
-# AgentCore Gateway URL and Target Name（環境変数またはAPIから取得）
+# Claude Sonnet 4.5を使用（Global Inference Profile）
+BEDROCK_MODEL_ID = os.environ.get("BEDROCK_MODEL_ID", "global.anthropic.claude-sonnet-4-5-20250929-v1:0")
+
+# ツール呼び出しループの最大回数
+MAX_TOOL_ITERATIONS = 10
+
+# OAuth認証完了後のコールバックURL
+OAUTH_CALLBACK_URL = os.environ.get("OAUTH_CALLBACK_URL", "http://localhost:9090/oauth2/callback")
+
+# 共通のboto3設定: TCP keep-aliveで接続を再利用し、接続タイムアウトは短めにして早期に失敗させる
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=20,
+    connect_timeout=3,
+    read_timeout=60,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+bedrock_runtime = boto3.client("bedrock-runtime", region_name=AWS_REGION, config=BOTO_CONFIG)
+bedrock_agentcore = boto3.client("bedrock-agentcore", region_name=AWS_REGION, config=BOTO_CONFIG)
+
+# Gateway呼び出し用のSigV4署名（認証情報は起動時に一度だけ解決し、期限切れ時はbotocoreが自動更新）
+boto_session = boto3.Session()
+gateway_signer = SigV4Auth(boto_session.get_credentials(), "bedrock-agentcore", AWS_REGION)
+
+# Gateway呼び出し用のHTTPセッション（ツール呼び出し間でTCP/TLS接続を再利用）
+gateway_http = requests.Session()
+gateway_http.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+# Gateway設定のキャッシュ（コンテナ再起動時にコントロールプレーンAPIの呼び出しを省略）
+GATEWAY_CACHE_PATH = os.environ.get("GATEWAY_CACHE_PATH", "/tmp/gateway_config.json")
+GATEWAY_CACHE_TTL_SECONDS = int(os.environ.get("GATEWAY_CACHE_TTL_SECONDS", "3600"))
+
+
+def load_cached_gateway_config(gateway_name: str, target_name: str) -> tuple[str, str, str] | None:
+    """
+    キャッシュファイルからGateway設定を読み込む
+
+    Args:
+        gateway_name: Gateway名（キャッシュ作成時の名前と一致する場合のみ使用）
+        target_name: Gateway Target名（キャッシュ作成時の名前と一致する場合のみ使用）
+
+    Returns:
+        Tuple of (gateway_url, gateway_id, target_name)（キャッシュがない・期限切れ・名前が異なる場合はNone）
+    """
+    try:
+        with open(GATEWAY_CACHE_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - cached.get("ts", 0) >= GATEWAY_CACHE_TTL_SECONDS:
+        return None
+
+    if cached.get("name") != gateway_name or cached.get("target") != target_name:
+        return None
+
+    logger.info("Using cached Gateway config: %s", cached.get("url"))
+    return cached.get("url", ""), cached.get("id", ""), cached.get("target", "")
+
+
+def save_gateway_config_cache(gateway_name: str, gateway_url: str, gateway_id: str, target_name: str) -> None:
+    """
+    解決済みのGateway設定をキャッシュファイルに保存する
+
+    Args:
+        gateway_name: Gateway名
+        gateway_url: Gateway URL
+        gateway_id: Gateway ID
+        target_name: Gateway Target名
+    """
+    try:
+        with open(GATEWAY_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                {"name": gateway_name, "url": gateway_url, "id": gateway_id, "target": target_name, "ts": time.time()},
+                f,
+            )
+    except OSError as e:
+        logger.warning("Failed to write Gateway config cache: %s", e)
+
+
+def invalidate_gateway_config_cache() -> None:
+    """
+    Gateway設定のキャッシュファイルを削除する
+
+    Gatewayが見つからない場合に呼び出し、次回の起動時にAPIから再取得させる
+    """
+    try:
+        os.remove(GATEWAY_CACHE_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Failed to remove Gateway config cache: %s", e)
+
+
+def fetch_gateway_config_from_api(
+    gateway_name: str,
+    target_name: str,
+    gateway_id: str = "",
+    gateway_url: str = "",
+) -> tuple[str, str, str]:
+    """
+    AgentCore Control APIからGateway URLとTarget Nameを取得する
+
+    既に判明している値（環境変数のGateway ID/URL）に対応するAPI呼び出しは省略する
+
+    Args:
+        gateway_name: Gateway名
+        target_name: Gateway Target名
+        gateway_id: Gateway ID（指定時はlist_gatewaysを省略）
+        gateway_url: Gateway URL（指定時はget_gatewayを省略）
+
+    Returns:
+        Tuple of (gateway_url, gateway_id, target_name)
+    """
+    try:
+        bedrock_agentcore_control = boto3.client("bedrock-agentcore-control", region_name=AWS_REGION, config=BOTO_CONFIG)
+
+        # Gateway IDが未指定の場合のみ、一覧から名前で検索
+        if not gateway_id:
+            response = bedrock_agentcore_control.list_gateways()
+            gateways_by_name = {gateway.get("name"): gateway for gateway in response.get("items", [])}
+            gateway = gateways_by_name.get(gateway_name)
+            if not gateway:
+                logger.warning(f"Gateway not found: {gateway_name}")
+                return "", "", ""
+            gateway_id = gateway.get("gatewayId")
+
+        # Gateway URLが未指定の場合のみ、詳細を取得してURLを入手
+        if not gateway_url:
+            try:
+                gateway_detail = bedrock_agentcore_control.get_gateway(gatewayIdentifier=gateway_id)
+                gateway_url = gateway_detail.get("gatewayUrl")
+                logger.info(f"Found Gateway: {gateway_name} -> {gateway_url}")
+            except Exception as e:
+                logger.error(f"Failed to get Gateway detail: {e}")
+                gateway_url = ""
+
+        # Gateway Targetを取得
+        try:
+            targets_response = bedrock_agentcore_control.list_gateway_targets(gatewayIdentifier=gateway_id)
+            if any(target.get("name") == target_name for target in targets_response.get("items", [])):
+                logger.info(f"Found Target: {target_name}")
+                return gateway_url, gateway_id, target_name
+        except Exception as e:
+            logger.error(f"Failed to get Gateway Target: {e}")
+
+        return gateway_url, gateway_id, ""
+
+    except Exception as e:
+        logger.error(f"Failed to get Gateway config from API: {e}")
+
+    return "", "", ""
+
+
+# AgentCore Gateway URL and Target Name（環境変数、キャッシュ、APIの順に取得）
 def get_gateway_config():
     """
     Gateway URLとTarget Nameを取得する
-    環境変数が設定されていればそれを使用し、なければAPI経由で取得
+    環境変数が設定されていればそれを使用し、なければキャッシュ、API経由の順で取得
+    キャッシュは環境変数が1つも設定されていない場合だけ使用する（明示的な設定を優先する）
 
     Returns:
         Tuple of (gateway_url, gateway_id, target_name)
@@ -56,51 +217,28 @@ def get_gateway_config():
 
     # Gateway名から取得
     gateway_name = os.environ.get("GATEWAY_NAME", "line-agent-calendar-gateway")
-    target_name = os.environ.get("GATEWAY_TARGET_NAME", "calendar-operations")
-
-    try:
-        bedrock_agentcore_control = boto3.client("bedrock-agentcore-control", region_name=AWS_REGION)
+    target_name = gateway_target_name or "calendar-operations"
 
-        # Gatewayを一覧取得して該当するものを見つける
-        response = bedrock_agentcore_control.list_gateways()
-        logger.info(f"ListGateways response: {response}")
-        for gateway in response.get("items", []):
-            logger.info(f"Checking gateway: {gateway}")
-            if gateway.get("name") == gateway_name:
-                gateway_id = gateway.get("gatewayId")
+    if not (gateway_url or gateway_id or gateway_target_name):
+        cached = load_cached_gateway_config(gateway_name, target_name)
+        if cached:
+            return cached
 
-                # Gateway詳細を取得してURLを入手
-                try:
-                    gateway_detail = bedrock_agentcore_control.get_gateway(gatewayIdentifier=gateway_id)
-                    gateway_url = gateway_detail.get("gatewayUrl")
-                    logger.info(f"Found Gateway: {gateway_name} -> {gateway_url}")
-                except Exception as e:
-                    logger.error(f"Failed to get Gateway detail: {e}")
-                    gateway_url = ""
-
-                # Gateway Targetを取得
-                try:
-                    targets_response = bedrock_agentcore_control.list_gateway_targets(gatewayIdentifier=gateway_id)
-                    for target in targets_response.get("items", []):
-                        if target.get("name") == target_name:
-                            target_name_found = target.get("name")
-                            logger.info(f"Found Target: {target_name_found}")
-                            return gateway_url, gateway_id, target_name_found
-                except Exception as e:
-                    logger.error(f"Failed to get Gateway Target: {e}")
-
-                return gateway_url, gateway_id, ""
-
-        logger.warning(f"Gateway not found: {gateway_name}")
-    except Exception as e:
-        logger.error(f"Failed to get Gateway config from API: {e}")
+    gateway_url, gateway_id, target_name_found = fetch_gateway_config_from_api(
+        gateway_name, target_name, gateway_id=gateway_id, gateway_url=gateway_url
+    )
+    if gateway_url and target_name_found:
+        save_gateway_config_cache(gateway_name, gateway_url, gateway_id, target_name_found)
 
-    return "", "", ""
+    return gateway_url, gateway_id, target_name_found
 
 GATEWAY_URL, GATEWAY_ID, GATEWAY_TARGET_NAME = get_gateway_config()
 
-# Claudeに渡すツール定義
-CALENDAR_TOOLS = [
+# MCPツール名のプレフィックス（{TargetName}___{ToolName}形式）
+GATEWAY_TOOL_PREFIX = f"{GATEWAY_TARGET_NAME}___"
+
+# Claudeに渡すツール定義（起動後に変更しないためタプルで保持）
+CALENDAR_TOOLS = (
     {
         "name": "list_calendar_events",
         "description": "カレンダーの予定を取得する。日時の範囲を指定して予定一覧を取得できます。",
@@ -200,9 +338,120 @@ CALENDAR_TOOLS = [
             },
             "required": ["event_id"]
         }
+    },
+    {
+        "name": "batch_calendar_operations",
+        "description": "複数の予定の一覧・取得・作成・更新・削除を1回のリクエストでまとめて実行する。複数の期間の予定確認や、複数の予定を一度に操作する場合に使用する。",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "operations": {
+                    "type": "array",
+                    "description": "実行する操作のリスト（最大50件、結果は同じ順序で返る）",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "action": {
+                                "type": "string",
+                                "enum": ["list", "get", "create", "update", "delete"],
+                                "description": "操作の種類"
+                            },
+                            "time_min": {
+                                "type": "string",
+                                "description": "listの取得開始日時（ISO 8601形式）"
+                            },
+                            "time_max": {
+                                "type": "string",
+                                "description": "listの取得終了日時（ISO 8601形式）"
+                            },
+                            "max_results": {
+                                "type": "integer",
+                                "description": "listの最大取得件数（デフォルト: 10）"
+                            },
+                            "event_id": {
+                                "type": "string",
+                                "description": "対象の予定のID（get/update/deleteで必須）"
+                            },
+                            "summary": {
+                                "type": "string",
+                                "description": "予定のタイトル（createで必須）"
+                            },
+                            "start_time": {
+                                "type": "string",
+                                "description": "開始日時（ISO 8601形式、createで必須）"
+                            },
+                            "end_time": {
+                                "type": "string",
+                                "description": "終了日時（ISO 8601形式、createで必須）"
+                            },
+                            "description": {
+                                "type": "string",
+                                "description": "予定の詳細説明（オプション）"
+                            },
+                            "location": {
+                                "type": "string",
+                                "description": "予定の場所（オプション）"
+                            }
+                        },
+                        "required": ["action"]
+                    }
+                }
+            },
+            "required": ["operations"]
+        }
     }
+)
+
+# 副作用のないツール（応答のストリーミング中に先行して実行してよい）
+# 書き込み系のツールはstop_reasonがtool_useと確定してから実行する
+READ_ONLY_TOOLS = frozenset({"list_calendar_events"})
+
+# 送信用JSONは空白なしでエンコードする（転送量とtool_resultのトークン数を削減）
+JSON_SEPARATORS = (",", ":")
+
+# システムプロンプト
+SYSTEM_PROMPT = """あなたはLINE秘書アシスタントです。
+ユーザーの質問に対して、親切で簡潔な日本語で回答してください。
+
+Googleカレンダーの操作ツールを使って、以下のことができます：
+- 予定の確認・検索
+- 新しい予定の作成
+- 既存の予定の更新
+- 予定の削除
+- 複数の予定の一括操作
+
+日時を指定する際は、ISO 8601形式（例: 2025-10-30T14:00:00+09:00）を使用してください。
+現在の日時を基準に適切に計算してください。"""
+
+# systemにキャッシュポイントを設定し、tools + system のプレフィックスをプロンプトキャッシュさせる
+# （ツールループの2回目以降はキャッシュから読み込まれる）
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
 ]
 
+# Bedrockリクエストの固定部分（system, toolsなど）は起動時に一度だけシリアライズしておく
+BEDROCK_REQUEST_PREFIX = (
+    '{"anthropic_version":"bedrock-2023-05-31","max_tokens":2000,'
+    f'"system":{json.dumps(SYSTEM_BLOCKS, ensure_ascii=False, separators=JSON_SEPARATORS)},'
+    f'"tools":{json.dumps(CALENDAR_TOOLS, ensure_ascii=False, separators=JSON_SEPARATORS)},'
+    '"messages":'
+)
+
+
+def build_bedrock_request_body(messages: list[dict[str, Any]]) -> str:
+    """
+    Bedrockへのリクエストボディ（JSON文字列）を構築する
+
+    固定部分は事前にシリアライズ済みのため、毎回エンコードするのはmessagesのみ
+
+    Args:
+        messages: 会話履歴
+
+    Returns:
+        リクエストボディ
+    """
+    return BEDROCK_REQUEST_PREFIX + json.dumps(messages, ensure_ascii=False, separators=JSON_SEPARATORS) + "}"
+
 
 def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: str = "default-user") -> dict[str, Any]:
     """
@@ -216,7 +465,7 @@ def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: s
     Returns:
         ツールの実行結果
     """
-    logger.info(f"execute_calendar_tool called: tool_name={tool_name}, GATEWAY_URL={GATEWAY_URL}, GATEWAY_TARGET_NAME={GATEWAY_TARGET_NAME}")
+    logger.info("execute_calendar_tool called: tool_name=%s, GATEWAY_URL=%s, GATEWAY_TARGET_NAME=%s", tool_name, GATEWAY_URL, GATEWAY_TARGET_NAME)
 
     if not GATEWAY_URL:
         logger.error("Gateway URL not configured")
@@ -225,7 +474,7 @@ def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: s
     try:
         # MCP tools/call リクエストを構築
         # ツール名を{TargetName}___{ToolName}形式に変換
-        mcp_tool_name = f"{GATEWAY_TARGET_NAME}___{tool_name}"
+        mcp_tool_name = GATEWAY_TOOL_PREFIX + tool_name
 
         mcp_request = {
             "jsonrpc": "2.0",
@@ -237,13 +486,9 @@ def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: s
             }
         }
 
-        logger.info(f"Calling Gateway: {GATEWAY_URL} with tool={mcp_tool_name}")
+        logger.info("Calling Gateway: %s with tool=%s", GATEWAY_URL, mcp_tool_name)
 
         # GatewayにHTTPリクエストを送信（IAM認証のみ）
-        import requests
-        from botocore.auth import SigV4Auth
-        from botocore.awsrequest import AWSRequest
-
         # リクエストを準備（Workload Access Tokenは不要、IAM認証のみ）
         headers = {
             "Content-Type": "application/json",
@@ -252,30 +497,32 @@ def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: s
         request = AWSRequest(
             method="POST",
             url=GATEWAY_URL,
-            data=json.dumps(mcp_request),
+            data=json.dumps(mcp_request, ensure_ascii=False, separators=JSON_SEPARATORS).encode("utf-8"),
             headers=headers
         )
 
         # SigV4署名を追加
-        credentials = boto3.Session().get_credentials()
-        SigV4Auth(credentials, "bedrock-agentcore", AWS_REGION).add_auth(request)
+        gateway_signer.add_auth(request)
 
         # リクエストを送信
         prepped = request.prepare()
-        response = requests.post(
+        response = gateway_http.post(
             prepped.url,
             headers=dict(prepped.headers),
             data=prepped.body,
             timeout=30
         )
 
-        logger.info(f"Gateway response: {response.status_code}")
+        logger.info("Gateway response: %s", response.status_code)
 
         if response.status_code != 200:
+            if response.status_code == 404:
+                # Gatewayが再作成された可能性があるため、キャッシュを破棄して次回起動時に再取得する
+                invalidate_gateway_config_cache()
             return {"success": False, "error": f"Gateway error: {response.status_code} - {response.text}"}
 
         result = response.json()
-        logger.info(f"Gateway result: {result}")
+        logger.info("Gateway result: %s", result)
 
         # MCP responseからcontentを抽出
         if "result" in result and "content" in result["result"]:
@@ -283,13 +530,24 @@ def execute_calendar_tool(tool_name: str, tool_input: dict[str, Any], user_id: s
             if isinstance(content, list) and len(content) > 0:
                 # テキストコンテンツを抽出
                 text_content = content[0].get("text", "")
-                try:
-                    return json.loads(text_content)
-                except:
-                    return {"success": True, "result": text_content}
+
+                # JSONオブジェクト/配列の場合のみパースし、プレーンテキストは例外を経由せずそのまま返す
+                if text_content.lstrip()[:1] in ("{", "["):
+                    try:
+                        return json.loads(text_content)
+                    except ValueError:
+                        logger.warning("Gateway returned malformed JSON content")
+
+                return {"success": True, "result": text_content}
 
         return result
 
+    except requests.exceptions.ConnectionError as e:
+        # Gatewayが削除された場合はホスト名を解決できないため、キャッシュを破棄する
+        invalidate_gateway_config_cache()
+        logger.error("Error executing calendar tool: %s", e, exc_info=True)
+        return {"success": False, "error": str(e)}
+
     except Exception as e:
         logger.error(f"Error executing calendar tool: {e}", exc_info=True)
         return {"success": False, "error": str(e)}
@@ -311,22 +569,37 @@ def on_auth_url_handler(url: str) -> None:
     provider_name="google-calendar-provider",
     scopes=["https://www.googleapis.com/auth/calendar"],
     auth_flow="USER_FEDERATION",
-    callback_url=os.environ.get("OAUTH_CALLBACK_URL", "http://localhost:9090/oauth2/callback"),
+    callback_url=OAUTH_CALLBACK_URL,
     on_auth_url=on_auth_url_handler,
     force_authentication=False,
 )
-async def execute_calendar_tool_with_oauth(
-    *,
+async def get_calendar_access_token(*, access_token: str) -> str:
+    """
+    Google CalendarのOAuth2アクセストークンを取得する
+
+    AgentCore Identityへの問い合わせは1回の呼び出しにつき1度だけ行い、
+    取得したトークンを同じターン内の全ツール呼び出しで共有する
+
+    Args:
+        access_token: Google OAuth access token (auto-injected by decorator)
+
+    Returns:
+        アクセストークン
+    """
+    return access_token
+
+
+async def execute_calendar_tool_with_token(
     access_token: str,
     tool_name: str,
     tool_input: dict[str, Any],
     user_id: str = "default-user"
 ) -> dict[str, Any]:
     """
-    OAuth2認証付きでカレンダーツールを実行する
+    取得済みのアクセストークンでカレンダーツールを実行する
 
     Args:
-        access_token: Google OAuth access token (auto-injected by decorator)
+        access_token: Google OAuth access token
         tool_name: ツール名
         tool_input: ツールの入力パラメータ
         user_id: ユーザーID
@@ -337,8 +610,81 @@ async def execute_calendar_tool_with_oauth(
     # access_tokenをtool_inputに追加
     tool_input_with_token = {**tool_input, "access_token": access_token}
 
-    # Gateway経由でLambdaを呼び出し
-    return execute_calendar_tool(tool_name, tool_input_with_token, user_id)
+    # Gateway経由でLambdaを呼び出し（ブロッキングI/Oはスレッドで実行し、他のツール呼び出しと並列化）
+    return await asyncio.to_thread(execute_calendar_tool, tool_name, tool_input_with_token, user_id)
+
+
+def invoke_bedrock_streaming(
+    model_id: str,
+    body: str,
+    on_tool_use: Callable[[dict[str, Any]], None] | None = None,
+) -> tuple[str | None, list[dict[str, Any]]]:
+    """
+    Bedrockをストリーミングで呼び出し、受信したイベントから応答を組み立てる
+
+    Args:
+        model_id: モデルID
+        body: リクエストボディ（JSON文字列）
+        on_tool_use: tool_useブロックの受信完了時に呼ばれるコールバック（応答全体の完了を待たない）
+            入力のJSONが途中で切れている（max_tokensで打ち切られた）ブロックでは呼ばれない
+
+    Returns:
+        Tuple of (stop_reason, content)
+    """
+    response = bedrock_runtime.invoke_model_with_response_stream(
+        modelId=model_id,
+        body=body
+    )
+
+    blocks: dict[int, dict[str, Any]] = {}
+    fragments: dict[int, list[str]] = {}
+    stop_reason = None
+
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+
+        data = json.loads(chunk["bytes"])
+        event_type = data.get("type")
+
+        if event_type == "message_start":
+            usage = data.get("message", {}).get("usage", {})
+            logger.info(
+                "Prompt cache: read=%s, write=%s",
+                usage.get("cache_read_input_tokens", 0),
+                usage.get("cache_creation_input_tokens", 0),
+            )
+        elif event_type == "content_block_start":
+            index = data["index"]
+            blocks[index] = dict(data["content_block"])
+            fragments[index] = []
+        elif event_type == "content_block_delta":
+            delta = data["delta"]
+            # text_delta / input_json_delta を断片として蓄積
+            fragments[data["index"]].append(delta.get("text") or delta.get("partial_json") or "")
+        elif event_type == "content_block_stop":
+            index = data["index"]
+            block = blocks[index]
+            joined = "".join(fragments.pop(index, []))
+            if block.get("type") == "tool_use":
+                try:
+                    block["input"] = json.loads(joined) if joined else {}
+                except json.JSONDecodeError:
+                    # 生成が途中で打ち切られた入力では実行しない
+                    logger.warning("Incomplete input for tool %s", block.get("name"))
+                    block["input"] = {}
+                    continue
+                if on_tool_use:
+                    on_tool_use(block)
+            elif block.get("type") == "text":
+                block["text"] = block.get("text", "") + joined
+        elif event_type == "message_delta":
+            stop_reason = data.get("delta", {}).get("stop_reason", stop_reason)
+        elif event_type == "message_stop":
+            break
+
+    return stop_reason, [blocks[index] for index in sorted(blocks)]
 
 
 async def generate_ai_response(user_message: str, user_id: str = "default-user") -> str:
@@ -353,22 +699,6 @@ async def generate_ai_response(user_message: str, user_id: str = "default-user")
         AIが生成した応答
     """
     try:
-        # Claude Sonnet 4.5を使用（Global Inference Profile）
-        model_id = "global.anthropic.claude-sonnet-4-5-20250929-v1:0"
-
-        # システムプロンプト
-        system_prompt = """あなたはLINE秘書アシスタントです。
-ユーザーの質問に対して、親切で簡潔な日本語で回答してください。
-
-Googleカレンダーの操作ツールを使って、以下のことができます：
-- 予定の確認・検索
-- 新しい予定の作成
-- 既存の予定の更新
-- 予定の削除
-
-日時を指定する際は、ISO 8601形式（例: 2025-10-30T14:00:00+09:00）を使用してください。
-現在の日時を基準に適切に計算してください。"""
-
         # 会話履歴（messages配列）
         messages = [
             {
@@ -377,32 +707,68 @@ Googleカレンダーの操作ツールを使って、以下のことができ
             }
         ]
 
-        # ツール呼び出しループ（最大10回まで）
-        max_iterations = 10
-        for iteration in range(max_iterations):
-            # リクエストボディを作成
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 2000,
-                "system": system_prompt,
-                "messages": messages,
-                "tools": CALENDAR_TOOLS  # カレンダーツールを追加
-            }
-
-            logger.info(f"Iteration {iteration + 1}: Invoking Bedrock")
-
-            # Bedrock Runtimeを呼び出し
-            response = bedrock_runtime.invoke_model(
-                modelId=model_id,
-                body=json.dumps(request_body)
+        loop = asyncio.get_running_loop()
+
+        # Google OAuth2アクセストークン（ツールが必要になった時点で一度だけ取得）
+        access_token_task: asyncio.Future[str] | None = None
+
+        async def run_tool(block: dict[str, Any]) -> dict[str, Any]:
+            nonlocal access_token_task
+            if access_token_task is None:
+                access_token_task = asyncio.ensure_future(get_calendar_access_token(
+                    access_token=""  # Decorator will inject the actual token
+                ))
+            access_token = await access_token_task
+
+            logger.info("Executing tool: %s with input: %s", block.get("name"), block.get("input"))
+            return await execute_calendar_tool_with_token(
+                access_token,
+                tool_name=block.get("name"),
+                tool_input=block.get("input"),
+                user_id=user_id
             )
 
-            # レスポンスを解析
-            response_body = json.loads(response["body"].read())
-            stop_reason = response_body.get("stop_reason")
-            content = response_body.get("content", [])
+        # ツール呼び出しループ（最大MAX_TOOL_ITERATIONS回まで）
+        for iteration in range(MAX_TOOL_ITERATIONS):
+            logger.info("Iteration %d: Invoking Bedrock", iteration + 1)
+
+            # 読み取り専用のツールは受信した時点で実行を開始し、残りの生成と並行させる
+            pending_tools: dict[str, concurrent.futures.Future[dict[str, Any]]] = {}
+            # 入力を最後まで受信できたtool_useブロックのID
+            parsed_tools: set[str] = set()
+
+            def dispatch_tool(block: dict[str, Any]) -> None:
+                parsed_tools.add(block.get("id"))
+                if block.get("name") in READ_ONLY_TOOLS:
+                    pending_tools[block.get("id")] = asyncio.run_coroutine_threadsafe(run_tool(block), loop)
+
+            # Bedrock Runtimeをストリーミングで呼び出し（イベント受信と並行して応答を組み立てる）
+            # boto3はブロッキングI/Oのため、イベントループを止めないようスレッドで実行
+            stop_reason = None
+            try:
+                stop_reason, content = await asyncio.to_thread(
+                    invoke_bedrock_streaming, BEDROCK_MODEL_ID, build_bedrock_request_body(messages), dispatch_tool
+                )
+            finally:
+                if stop_reason != "tool_use":
+                    # ツール結果は不要になったため、未開始のツールは取り消す
+                    # （先行実行するのは読み取り専用ツールだけなので、実行中のものが残っても副作用はない）
+                    for future in pending_tools.values():
+                        future.cancel()
+
+            logger.info("Stop reason: %s", stop_reason)
+
+            if stop_reason != "tool_use":
+                # end_turnの場合はテキスト応答を抽出して即座に終了
+                if stop_reason == "end_turn":
+                    return next(
+                        (block.get("text", "応答がありませんでした。") for block in content if block.get("type") == "text"),
+                        "応答がありませんでした。"
+                    )
 
-            logger.info(f"Stop reason: {stop_reason}")
+                # 想定外のstop_reason
+                logger.warning("Unexpected stop_reason: %s", stop_reason)
+                return "申し訳ございません。応答を生成できませんでした。"
 
             # アシスタントの応答をメッセージ履歴に追加
             messages.append({
@@ -410,55 +776,39 @@ Googleカレンダーの操作ツールを使って、以下のことができ
                 "content": content
             })
 
-            # tool_useがある場合はツールを実行
-            if stop_reason == "tool_use":
-                tool_results = []
-
-                for block in content:
-                    if block.get("type") == "tool_use":
-                        tool_name = block.get("name")
-                        tool_input = block.get("input")
-                        tool_use_id = block.get("id")
-
-                        logger.info(f"Executing tool: {tool_name} with input: {tool_input}")
-
-                        # ツールを実行（OAuth2認証付き）
-                        tool_result = await execute_calendar_tool_with_oauth(
-                            access_token="",  # Decorator will inject the actual token
-                            tool_name=tool_name,
-                            tool_input=tool_input,
-                            user_id=user_id
-                        )
-
-                        # ツール結果を追加
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": tool_use_id,
-                            "content": json.dumps(tool_result, ensure_ascii=False)
-                        })
-
-                # ツール結果をメッセージ履歴に追加
-                messages.append({
-                    "role": "user",
-                    "content": tool_results
-                })
-
-                # 次のイテレーションでClaudeを再度呼び出す
-                continue
-
-            # end_turnの場合は終了
-            elif stop_reason == "end_turn":
-                # テキスト応答を抽出
-                for block in content:
-                    if block.get("type") == "text":
-                        return block.get("text", "応答がありませんでした。")
+            async def await_tool(block: dict[str, Any]) -> dict[str, Any]:
+                tool_id = block.get("id")
+                # ストリーミング中に開始したツールは完了を待つ
+                if tool_id in pending_tools:
+                    return await asyncio.wrap_future(pending_tools[tool_id])
+                # 書き込み系のツールはここで実行する
+                if tool_id in parsed_tools:
+                    return await run_tool(block)
+                raise ValueError("ツールの入力が不完全なため実行しませんでした")
+
+            tool_use_blocks = [block for block in content if block.get("type") == "tool_use"]
+            tool_outputs = await asyncio.gather(
+                *(await_tool(block) for block in tool_use_blocks), return_exceptions=True
+            )
 
-                return "応答がありませんでした。"
+            # ツール結果を追加（1つのツールが失敗しても他の結果はClaudeに返す）
+            tool_results = []
+            for block, tool_result in zip(tool_use_blocks, tool_outputs):
+                if isinstance(tool_result, Exception):
+                    logger.error("Tool %s failed: %s", block.get("name"), tool_result, exc_info=tool_result)
+                    tool_result = {"success": False, "error": str(tool_result)}
+
+                tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": block.get("id"),
+                    "content": json.dumps(tool_result, ensure_ascii=False, separators=JSON_SEPARATORS)
+                })
 
-            else:
-                # 想定外のstop_reason
-                logger.warning(f"Unexpected stop_reason: {stop_reason}")
-                return "申し訳ございません。応答を生成できませんでした。"
+            # ツール結果をメッセージ履歴に追加（次のイテレーションでClaudeを再度呼び出す）
+            messages.append({
+                "role": "user",
+                "content": tool_results
+            })
 
         # 最大イテレーションに達した場合
         logger.error("Max iterations reached")
@@ -493,11 +843,11 @@ async def agent_invocation(payload: dict[str, Any], context: RequestContext) ->
         user_message = payload.get("prompt", "")
         user_id = payload.get("user_id", "default-user")
 
-        logger.info(f"Received invocation: prompt='{user_message[:50]}...', user_id={user_id}")
+        logger.info("Received invocation: prompt='%.50s...', user_id=%s", user_message, user_id)
 
         # RequestContextからヘッダーを確認（デバッグ用）
         if hasattr(context, 'request_headers'):
-            logger.info(f"Request headers: {context.request_headers}")
+            logger.info("Request headers: %s", context.request_headers)
 
         # Set user_id in context for AgentCore Identity SDK
         # LINE user_id を使用（各ユーザーが個別のGoogleアカウントと連携）
@@ -509,7 +859,7 @@ async def agent_invocation(payload: dict[str, Any], context: RequestContext) ->
         # 認証URLが生成された場合、応答に含める
         if auth_url_storage:
             auth_url = auth_url_storage[0]
-            logger.info(f"Authentication URL generated: {auth_url}")
+            logger.info("Authentication URL generated: %s", auth_url)
             # 認証URLを応答に含める（LINE webhookで検出される）
             return {
                 "response": f"Authorization URL: {auth_url}",
@@ -2,25 +2,60 @@
 Google Calendar操作Lambda関数
 
 AgentCore Identityを使用してGoogle Calendar APIにアクセスし、
-4つの基本操作（確認・追加・変更・削除）を提供する
+4つの基本操作（確認・追加・変更・削除）とその一括実行を提供する
 """
 
-import asyncio
 import json
+import logging
 import os
+from collections.abc import Callable
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 
 
+# ログ設定（LOG_LEVEL=DEBUGでイベント内容を出力）
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
 # Google Calendar APIのスコープ
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+# Google APIへのHTTP接続（アクセストークンが変わってもコンテナ内で同じ接続を再利用）
+google_http = build_http()
+
+# 1回のバッチリクエストにまとめられる操作数の上限（Calendar APIの上限は50件）
+MAX_BATCH_OPERATIONS = 50
+
+
+@lru_cache(maxsize=16)
+def get_calendar_service(access_token: str) -> Any:
+    """
+    Calendar APIサービスを構築する
+
+    構築済みのサービスはアクセストークンごとにキャッシュし、
+    Lambdaのウォームコンテナでは同じトークンでの再構築を省略する
+
+    Args:
+        access_token: Google OAuth access token
+
+    Returns:
+        Calendar APIサービス
+    """
+    creds = Credentials(token=access_token, scopes=SCOPES)
+    authorized_http = AuthorizedHttp(creds, http=google_http)
+
+    # ライブラリ同梱のDiscoveryドキュメントを使用（ネットワーク取得・ファイルキャッシュなし）
+    return build("calendar", "v3", http=authorized_http, static_discovery=True, cache_discovery=False)
 
-async def list_calendar_events(
+
+def list_calendar_events(
     *,
     access_token: str,
     time_min: str | None = None,
@@ -40,11 +75,8 @@ async def list_calendar_events(
         予定のリスト
     """
     try:
-        # 認証情報を構築
-        creds = Credentials(token=access_token, scopes=SCOPES)
-
-        # Calendar APIサービスを構築
-        service = build("calendar", "v3", credentials=creds)
+        # Calendar APIサービスを取得（同一トークンならウォームコンテナ内で再利用）
+        service = get_calendar_service(access_token)
 
         # イベントを取得
         events_result = (
@@ -75,7 +107,7 @@ async def list_calendar_events(
         }
 
 
-async def create_calendar_event(
+def create_calendar_event(
     *,
     access_token: str,
     summary: str,
@@ -99,11 +131,8 @@ async def create_calendar_event(
         作成された予定の情報
     """
     try:
-        # 認証情報を構築
-        creds = Credentials(token=access_token, scopes=SCOPES)
-
-        # Calendar APIサービスを構築
-        service = build("calendar", "v3", credentials=creds)
+        # Calendar APIサービスを取得（同一トークンならウォームコンテナ内で再利用）
+        service = get_calendar_service(access_token)
 
         # イベントデータを構築
         event = {
@@ -135,7 +164,7 @@ async def create_calendar_event(
         }
 
 
-async def update_calendar_event(
+def update_calendar_event(
     *,
     access_token: str,
     event_id: str,
@@ -161,31 +190,26 @@ async def update_calendar_event(
         更新された予定の情報
     """
     try:
-        # 認証情報を構築
-        creds = Credentials(token=access_token, scopes=SCOPES)
-
-        # Calendar APIサービスを構築
-        service = build("calendar", "v3", credentials=creds)
+        # Calendar APIサービスを取得（同一トークンならウォームコンテナ内で再利用）
+        service = get_calendar_service(access_token)
 
-        # 既存のイベントを取得
-        event = service.events().get(calendarId="primary", eventId=event_id).execute()
-
-        # 更新するフィールドを設定
+        # 変更するフィールドのみを設定
+        patch_body: dict[str, Any] = {}
         if summary is not None:
-            event["summary"] = summary
+            patch_body["summary"] = summary
         if start_time is not None:
-            event["start"] = {"dateTime": start_time, "timeZone": "Asia/Tokyo"}
+            patch_body["start"] = {"dateTime": start_time, "timeZone": "Asia/Tokyo"}
         if end_time is not None:
-            event["end"] = {"dateTime": end_time, "timeZone": "Asia/Tokyo"}
+            patch_body["end"] = {"dateTime": end_time, "timeZone": "Asia/Tokyo"}
         if description is not None:
-            event["description"] = description
+            patch_body["description"] = description
         if location is not None:
-            event["location"] = location
+            patch_body["location"] = location
 
-        # イベントを更新
+        # イベントを部分更新（取得 + 全体更新の2往復を1往復にする）
         updated_event = (
             service.events()
-            .update(calendarId="primary", eventId=event_id, body=event)
+            .patch(calendarId="primary", eventId=event_id, body=patch_body)
             .execute()
         )
 
@@ -201,7 +225,7 @@ async def update_calendar_event(
         }
 
 
-async def delete_calendar_event(
+def delete_calendar_event(
     *,
     access_token: str,
     event_id: str,
@@ -217,11 +241,8 @@ async def delete_calendar_event(
         削除結果
     """
     try:
-        # 認証情報を構築
-        creds = Credentials(token=access_token, scopes=SCOPES)
-
-        # Calendar APIサービスを構築
-        service = build("calendar", "v3", credentials=creds)
+        # Calendar APIサービスを取得（同一トークンならウォームコンテナ内で再利用）
+        service = get_calendar_service(access_token)
 
         # イベントを削除
         service.events().delete(calendarId="primary", eventId=event_id).execute()
@@ -238,6 +259,134 @@ async def delete_calendar_event(
         }
 
 
+def build_batch_request(service: Any, operation: dict[str, Any]) -> Any:
+    """
+    一括操作の1件分をCalendar APIのリクエストオブジェクトに変換する
+
+    Args:
+        service: Calendar APIサービス
+        operation: 操作内容（actionと各操作のパラメータ）
+
+    Returns:
+        バッチに追加するHttpRequest
+    """
+    action = operation.get("action")
+    events = service.events()
+
+    if action == "list":
+        return events.list(
+            calendarId="primary",
+            timeMin=operation.get("time_min"),
+            timeMax=operation.get("time_max"),
+            maxResults=int(operation.get("max_results") or 10),
+            singleEvents=True,
+            orderBy="startTime",
+        )
+    if action == "get":
+        return events.get(calendarId="primary", eventId=operation["event_id"])
+    if action == "delete":
+        return events.delete(calendarId="primary", eventId=operation["event_id"])
+
+    # 作成・更新は指定されたフィールドのみを送る
+    body: dict[str, Any] = {}
+    for name in ("summary", "description", "location"):
+        if operation.get(name) is not None:
+            body[name] = operation[name]
+    if operation.get("start_time") is not None:
+        body["start"] = {"dateTime": operation["start_time"], "timeZone": "Asia/Tokyo"}
+    if operation.get("end_time") is not None:
+        body["end"] = {"dateTime": operation["end_time"], "timeZone": "Asia/Tokyo"}
+
+    if action == "create":
+        for name in ("summary", "start_time", "end_time"):
+            if operation.get(name) is None:
+                raise ValueError(f"{name} is required for create")
+        return events.insert(calendarId="primary", body=body)
+    if action == "update":
+        return events.patch(calendarId="primary", eventId=operation["event_id"], body=body)
+
+    raise ValueError(f"Unknown action: {action}")
+
+
+def batch_calendar_operations(
+    *,
+    access_token: str,
+    operations: list[dict[str, Any]],
+) -> dict[str, Any]:
+    """
+    複数の予定操作（一覧・取得・作成・更新・削除）を1回のバッチリクエストでまとめて実行する
+
+    Args:
+        access_token: Google OAuth access token (from AgentCore Runtime)
+        operations: 操作のリスト（各要素にaction: list/get/create/update/deleteと各操作のパラメータ）
+
+    Returns:
+        操作ごとの結果（operationsと同じ順序）
+    """
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        raise TypeError("operations must be a list of objects")
+    if not operations:
+        raise ValueError("operations must not be empty")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"operations must be {MAX_BATCH_OPERATIONS} or fewer")
+
+    try:
+        # Calendar APIサービスを取得（同一トークンならウォームコンテナ内で再利用）
+        service = get_calendar_service(access_token)
+
+        # コールバックは完了順に呼ばれるため、request_id（添字）で元の順序に戻す
+        results: list[dict[str, Any]] = [{} for _ in operations]
+
+        def on_response(request_id: str, response: Any, exception: HttpError | None) -> None:
+            index = int(request_id)
+            if exception is not None:
+                results[index] = {
+                    "success": False,
+                    "error": f"Google Calendar API error: {exception}",
+                }
+            elif operations[index].get("action") == "list":
+                events = response.get("items", [])
+                results[index] = {"success": True, "events": events, "count": len(events)}
+            elif operations[index].get("action") == "delete":
+                results[index] = {"success": True, "event_id": operations[index]["event_id"]}
+            else:
+                results[index] = {"success": True, "event": response}
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for index, operation in enumerate(operations):
+            batch.add(build_batch_request(service, operation), request_id=str(index))
+
+        # 全操作を1回のmultipartリクエストで送信
+        batch.execute()
+
+        return {
+            "success": all(result["success"] for result in results),
+            "results": results,
+        }
+
+    except HttpError as error:
+        return {
+            "success": False,
+            "error": f"Google Calendar API error: {error}",
+        }
+
+
+# ツール名 -> (操作関数, 受け付けるパラメータ名)
+CALENDAR_OPERATIONS: dict[str, tuple[Callable[..., dict[str, Any]], tuple[str, ...]]] = {
+    "list_calendar_events": (list_calendar_events, ("time_min", "time_max", "max_results")),
+    "create_calendar_event": (
+        create_calendar_event,
+        ("summary", "start_time", "end_time", "description", "location"),
+    ),
+    "update_calendar_event": (
+        update_calendar_event,
+        ("event_id", "summary", "start_time", "end_time", "description", "location"),
+    ),
+    "delete_calendar_event": (delete_calendar_event, ("event_id",)),
+    "batch_calendar_operations": (batch_calendar_operations, ("operations",)),
+}
+
+
 # Lambda ハンドラー
 def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     """
@@ -252,10 +401,11 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     Returns:
         操作結果
     """
-    # デバッグ: 受け取ったイベント全体をログ出力
-    import sys
-    print(f"[DEBUG] Received event: {json.dumps(event, default=str)}", file=sys.stdout, flush=True)
-    print(f"[DEBUG] Context custom: {context.client_context.custom if hasattr(context, 'client_context') and context.client_context else 'No client_context'}", file=sys.stdout, flush=True)
+    # デバッグ: 受け取ったイベント全体をログ出力（DEBUG時のみシリアライズする）
+    if logger.isEnabledFor(logging.DEBUG):
+        client_context = getattr(context, "client_context", None)
+        logger.debug("Received event: %s", json.dumps(event, default=str))
+        logger.debug("Context custom: %s", client_context.custom if client_context else "No client_context")
 
     # Gateway から渡される tool name を context から取得
     # Tool name format: "{target_name}___{tool_name}"
@@ -263,9 +413,9 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     try:
         original_tool_name = context.client_context.custom['bedrockAgentCoreToolName']
         tool_name = original_tool_name[original_tool_name.index(delimiter) + len(delimiter):]
-        print(f"[DEBUG] Detected tool name: {tool_name}", file=sys.stdout, flush=True)
+        logger.debug("Detected tool name: %s", tool_name)
     except (AttributeError, KeyError, ValueError) as e:
-        print(f"[ERROR] Failed to extract tool name from context: {e}", file=sys.stdout, flush=True)
+        logger.error("Failed to extract tool name from context: %s", e)
         return {
             "statusCode": 400,
             "body": json.dumps({
@@ -280,7 +430,7 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     # access_tokenを取得（AgentCore Runtimeから渡される）
     access_token = params.get("access_token")
     if not access_token:
-        print(f"[ERROR] access_token not found in params", file=sys.stdout, flush=True)
+        logger.error("access_token not found in params")
         return {
             "statusCode": 400,
             "body": json.dumps({
@@ -289,53 +439,29 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             })
         }
 
-    # Map tool names to operations
-    if tool_name == "list_calendar_events":
-        result = asyncio.run(
-            list_calendar_events(
-                access_token=access_token,
-                time_min=params.get("time_min"),
-                time_max=params.get("time_max"),
-                max_results=params.get("max_results", 10),
-            )
-        )
-    elif tool_name == "create_calendar_event":
-        result = asyncio.run(
-            create_calendar_event(
-                access_token=access_token,
-                summary=params.get("summary"),
-                start_time=params.get("start_time"),
-                end_time=params.get("end_time"),
-                description=params.get("description"),
-                location=params.get("location"),
-            )
-        )
-    elif tool_name == "update_calendar_event":
-        result = asyncio.run(
-            update_calendar_event(
-                access_token=access_token,
-                event_id=params.get("event_id"),
-                summary=params.get("summary"),
-                start_time=params.get("start_time"),
-                end_time=params.get("end_time"),
-                description=params.get("description"),
-                location=params.get("location"),
-            )
-        )
-    elif tool_name == "delete_calendar_event":
-        result = asyncio.run(
-            delete_calendar_event(
-                access_token=access_token,
-                event_id=params.get("event_id"),
-            )
-        )
-    else:
+    # ツール名から操作を引く
+    operation = CALENDAR_OPERATIONS.get(tool_name)
+    if operation is None:
         result = {
             "success": False,
             "error": f"Unknown tool: {tool_name}",
         }
+    else:
+        func, param_names = operation
+        kwargs = {name: params[name] for name in param_names if params.get(name) is not None}
+
+        try:
+            if "max_results" in kwargs:
+                kwargs["max_results"] = int(kwargs["max_results"])
+            result = func(access_token=access_token, **kwargs)
+        except (KeyError, TypeError, ValueError) as e:
+            # 必須パラメータの不足・型不正
+            result = {
+                "success": False,
+                "error": f"Invalid parameters for {tool_name}: {e}",
+            }
 
     return {
         "statusCode": 200 if result.get("success") else 400,
-        "body": json.dumps(result),
+        "body": json.dumps(result, ensure_ascii=False, separators=(",", ":")),
     }
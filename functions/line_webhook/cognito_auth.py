@@ -4,24 +4,55 @@ Cognito Authentication Helper
 LINE User IDをCognito User IDにマッピングし、JWT認証を実行
 """
 
+import base64
 import hashlib
 import hmac
 import logging
 import os
-from typing import Optional
+import secrets
+import time
+from typing import Any
 
 import boto3
+from botocore.config import Config
 
 logger = logging.getLogger()
 
+# 共通のboto3設定: TCP keep-aliveで接続を再利用し、タイムアウトは短めにしてLambdaを長時間ブロックしない
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=20,
+    connect_timeout=3,
+    read_timeout=30,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+
 # Cognito Client
-cognito_client = boto3.client("cognito-idp")
+cognito_client = boto3.client("cognito-idp", config=BOTO_CONFIG)
 
 # 環境変数
 USER_POOL_ID = os.environ["COGNITO_USER_POOL_ID"]
 APP_CLIENT_ID = os.environ["COGNITO_APP_CLIENT_ID"]
 APP_CLIENT_SECRET = os.environ.get("COGNITO_APP_CLIENT_SECRET", "")  # オプション
 
+# OAuthセッションの有効期間（秒）。セッションに保存したトークンはこの間にコールバックで使われる
+OAUTH_SESSION_TTL_SECONDS = 600
+
+# AgentCore Runtime呼び出しの読み取りタイムアウト（秒）
+RUNTIME_READ_TIMEOUT_SECONDS = 120
+
+# 有効期限の何秒前にトークンを再発行するか
+# Runtime呼び出しに使ったトークンはOAuthセッションに保存されるため、
+# Runtimeの応答待ちとセッションの有効期間が終わるまで有効である必要がある
+TOKEN_EXPIRY_MARGIN_SECONDS = OAUTH_SESSION_TTL_SECONDS + RUNTIME_READ_TIMEOUT_SECONDS
+
+# LINE User ID -> (JWT access token, 有効期限のepoch秒, refresh token)
+# Lambdaのウォームコンテナ内で再利用し、メッセージごとのCognito呼び出しを省く
+token_cache: dict[str, tuple[str, float, str]] = {}
+
+# 存在を確認済みのCognito username（ウォームコンテナではadmin_get_userを省略する）
+known_users: set[str] = set()
+
 
 def _calculate_secret_hash(username: str) -> str:
     """
@@ -42,7 +73,20 @@ def _calculate_secret_hash(username: str) -> str:
         message.encode("utf-8"),
         digestmod=hashlib.sha256,
     ).digest()
-    return hashlib.b64encode(secret_hash).decode()
+    return base64.b64encode(secret_hash).decode()
+
+
+def _generate_password() -> str:
+    """
+    Cognitoユーザー用のランダムなパスワードを生成する
+
+    User Poolのパスワードポリシーは文字種を要求しないため、
+    URL-safeなランダム文字列（192bit）をそのまま使う
+
+    Returns:
+        パスワード
+    """
+    return secrets.token_urlsafe(24)
 
 
 def get_or_create_cognito_user(line_user_id: str) -> str:
@@ -59,6 +103,9 @@ def get_or_create_cognito_user(line_user_id: str) -> str:
     # （もしくは、ハッシュ化やプレフィックス追加も可能）
     cognito_username = f"line_{line_user_id}"
 
+    if cognito_username in known_users:
+        return cognito_username
+
     try:
         # ユーザーが既に存在するか確認
         cognito_client.admin_get_user(
@@ -66,6 +113,7 @@ def get_or_create_cognito_user(line_user_id: str) -> str:
             Username=cognito_username
         )
         logger.info(f"Cognito user already exists: {cognito_username}")
+        known_users.add(cognito_username)
         return cognito_username
 
     except cognito_client.exceptions.UserNotFoundException:
@@ -73,9 +121,7 @@ def get_or_create_cognito_user(line_user_id: str) -> str:
         logger.info(f"Creating new Cognito user: {cognito_username}")
 
         # ランダムなパスワードを生成（ユーザーはパスワードを使わない）
-        import secrets
-        import string
-        password = ''.join(secrets.choice(string.ascii_letters + string.digits + string.punctuation) for _ in range(32))
+        password = _generate_password()
 
         try:
             # Cognito Userを作成
@@ -98,6 +144,7 @@ def get_or_create_cognito_user(line_user_id: str) -> str:
             )
 
             logger.info(f"Successfully created Cognito user: {cognito_username}")
+            known_users.add(cognito_username)
             return cognito_username
 
         except Exception as e:
@@ -149,6 +196,38 @@ def get_jwt_token(line_user_id: str) -> str:
         raise
 
 
+def _refresh_jwt_token(cognito_username: str, refresh_token: str) -> dict[str, Any] | None:
+    """
+    Refresh tokenでJWTトークンを再発行する
+
+    Args:
+        cognito_username: Cognito username
+        refresh_token: 前回の認証で取得したrefresh token
+
+    Returns:
+        AuthenticationResult（再発行に失敗した場合はNone）
+    """
+    secret_hash_params = {}
+    if APP_CLIENT_SECRET:
+        secret_hash_params["SECRET_HASH"] = _calculate_secret_hash(cognito_username)
+
+    try:
+        response = cognito_client.admin_initiate_auth(
+            UserPoolId=USER_POOL_ID,
+            ClientId=APP_CLIENT_ID,
+            AuthFlow="REFRESH_TOKEN_AUTH",
+            AuthParameters={
+                "REFRESH_TOKEN": refresh_token,
+                **secret_hash_params,
+            }
+        )
+        return response["AuthenticationResult"]
+
+    except Exception as e:
+        logger.warning(f"Failed to refresh JWT token, falling back to password auth: {e}")
+        return None
+
+
 def get_jwt_token_simple(line_user_id: str) -> str:
     """
     LINE User IDに対応するJWTトークンを簡易的に取得
@@ -156,19 +235,39 @@ def get_jwt_token_simple(line_user_id: str) -> str:
     パスワード管理を簡略化するため、ユーザーごとにパスワードを保存せず、
     毎回新しいパスワードでトークンを発行する方式
 
+    発行したトークンは有効期限までコンテナ内にキャッシュし、期限内なら再利用する。
+    期限切れの場合はrefresh tokenで再発行し、パスワードのリセットは行わない
+
     Args:
         line_user_id: LINE User ID
 
     Returns:
         JWT access token
     """
-    import secrets
-    import string
+    cognito_username = f"line_{line_user_id}"
+
+    cached = token_cache.get(line_user_id)
+    if cached:
+        access_token, expires_at, refresh_token = cached
+        if expires_at > time.time():
+            return access_token
+
+        # Refresh tokenで再発行（Cognito呼び出し1回、パスワード書き込みなし）
+        auth_result = _refresh_jwt_token(cognito_username, refresh_token)
+        if auth_result:
+            access_token = auth_result["AccessToken"]
+            token_cache[line_user_id] = (
+                access_token,
+                time.time() + auth_result["ExpiresIn"] - TOKEN_EXPIRY_MARGIN_SECONDS,
+                auth_result.get("RefreshToken", refresh_token),
+            )
+            logger.info(f"Successfully refreshed JWT token for user: {cognito_username}")
+            return access_token
 
     cognito_username = get_or_create_cognito_user(line_user_id)
 
     # 新しいパスワードを生成
-    password = ''.join(secrets.choice(string.ascii_letters + string.digits + "!@#$%^&*") for _ in range(32))
+    password = _generate_password()
 
     # パスワードをリセット
     cognito_client.admin_set_user_password(
@@ -194,7 +293,15 @@ def get_jwt_token_simple(line_user_id: str) -> str:
         }
     )
 
-    access_token = response["AuthenticationResult"]["AccessToken"]
+    auth_result = response["AuthenticationResult"]
+    access_token = auth_result["AccessToken"]
     logger.info(f"Successfully retrieved JWT token for user: {cognito_username}")
 
+    # 有効期限（ExpiresIn秒）の少し手前まで再利用し、期限切れ後はrefresh tokenで再発行する
+    token_cache[line_user_id] = (
+        access_token,
+        time.time() + auth_result["ExpiresIn"] - TOKEN_EXPIRY_MARGIN_SECONDS,
+        auth_result["RefreshToken"],
+    )
+
     return access_token
@@ -4,49 +4,142 @@ LINE Webhook Handler
 LINEからのWebhookを受け取り、AgentCore Runtimeを呼び出して応答を返す
 """
 
+import base64
+import concurrent.futures
+import hashlib
+import hmac
 import json
 import logging
 import os
+import re
+import time
 import urllib.parse
+from functools import lru_cache
 from typing import Any
 
 import boto3
 import requests
-from linebot.v3 import WebhookHandler
-from linebot.v3.exceptions import InvalidSignatureError
-from linebot.v3.messaging import (
-    ApiClient,
-    Configuration,
-    MessagingApi,
-    ReplyMessageRequest,
-    TextMessage,
-)
-from linebot.v3.webhooks import MessageEvent, TextMessageContent
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Cognito認証ヘルパーをインポート
-from cognito_auth import get_jwt_token_simple
+from cognito_auth import (
+    BOTO_CONFIG,
+    OAUTH_SESSION_TTL_SECONDS,
+    RUNTIME_READ_TIMEOUT_SECONDS,
+    get_jwt_token_simple,
+)
 
 # ログ設定
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # 環境変数
-CHANNEL_ACCESS_TOKEN = os.environ["LINE_CHANNEL_ACCESS_TOKEN"]
-CHANNEL_SECRET = os.environ["LINE_CHANNEL_SECRET"]
+LINE_SECRET_ARN = os.environ["LINE_SECRET_ARN"]
 AGENT_RUNTIME_ARN = os.environ["AGENT_RUNTIME_ARN"]
 AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
 OAUTH_SESSION_TABLE_NAME = os.environ.get("OAUTH_SESSION_TABLE_NAME", "line-agent-oauth-sessions")
 
-# LINE Bot API初期化
-configuration = Configuration(access_token=CHANNEL_ACCESS_TOKEN)
-handler = WebhookHandler(CHANNEL_SECRET)
+# AgentCore Runtime の呼び出しURL（JWT認証の場合の形式、ARNはURLエンコードして埋め込む）
+RUNTIME_URL = (
+    f"https://bedrock-agentcore.{AWS_REGION}.amazonaws.com/runtimes/"
+    f"{urllib.parse.quote(AGENT_RUNTIME_ARN, safe='')}/invocations?qualifier=DEFAULT"
+)
+
+# 固定のレスポンスボディ（起動時に一度だけシリアライズ）
+OK_BODY = json.dumps("OK")
+INVALID_SIGNATURE_BODY = json.dumps("Invalid signature")
+
+# LINE認証情報の再取得間隔（秒）。ローテーション後もウォームコンテナが新しい値を使えるようにする
+LINE_CREDENTIALS_TTL_SECONDS = 300
+
+# Secrets Manager client（LINE認証情報の取得用）
+secrets_client = boto3.client("secretsmanager", config=BOTO_CONFIG)
+
+# LINE認証情報のキャッシュ（アクセストークン, 署名検証用の鍵, 取得時刻）
+line_credentials: tuple[str, bytes, float] | None = None
+
+# Runtime応答から認証URLを抽出するパターン（優先順）
+AUTH_URL_PATTERNS = (
+    # パターン1: "Authorization URL: https://..."
+    re.compile(r"Authorization URL:\s*(https?://[^\s]+)"),
+    # パターン2: "認証してください: https://..."
+    re.compile(r"認証してください[：:]\s*(https?://[^\s]+)"),
+    # パターン3: URLのみ（https://accounts.google.com/... など）
+    re.compile(r"(https://accounts\.google\.com/[^\s]+)"),
+)
+
+# 認証URL内の session_id（state / redirect_uri にURLエンコードされて含まれる: session_id%3Dxxx）
+SESSION_ID_PATTERN = re.compile(r"session_id(?:=|%3D)(.+?)(?=&|%26|\s|$)")
+
+# AgentCore Runtime呼び出し用のHTTPセッション（ウォームコンテナでTLS接続を再利用）
+runtime_http = requests.Session()
+# 接続確立の失敗のみ再試行する（リクエスト送信後の失敗はカレンダー操作が重複しうるため再試行しない）
+runtime_http.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1),
+    ),
+)
+
+# Runtime呼び出しのタイムアウト（接続, 読み取り）: 接続できない場合は早期に失敗させる
+RUNTIME_TIMEOUT = (3, RUNTIME_READ_TIMEOUT_SECONDS)
 
-# Bedrock AgentCore Runtime client
-bedrock_client = boto3.client("bedrock-agentcore", region_name=AWS_REGION)
+# 複数ユーザーのメッセージを並行処理する用
+message_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 
-# DynamoDB client
-dynamodb = boto3.resource("dynamodb")
-session_table = dynamodb.Table(OAUTH_SESSION_TABLE_NAME)
+# 起動時の接続準備をバックグラウンドで実行する用
+background_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+# DynamoDB client（項目の形が固定なので、resourceの型変換を経由せずclientを直接使う）
+# バックグラウンドスレッドから同時に使われるため、スレッドセーフでないclient生成は起動時に済ませる
+dynamodb = boto3.client("dynamodb", config=BOTO_CONFIG)
+
+
+def get_line_credentials() -> tuple[str, bytes]:
+    """
+    LINE認証情報を取得する（TTL付きキャッシュ）
+
+    Secrets Managerから取得した値をウォームコンテナで再利用し、
+    TTLを過ぎた場合だけ再取得する
+
+    Returns:
+        (チャネルアクセストークン, 署名検証用のチャネルシークレット（バイト列）)
+    """
+    global line_credentials
+
+    now = time.monotonic()
+    if line_credentials is None or now - line_credentials[2] >= LINE_CREDENTIALS_TTL_SECONDS:
+        response = secrets_client.get_secret_value(SecretId=LINE_SECRET_ARN)
+        secret = json.loads(response["SecretString"])
+        line_credentials = (
+            secret["channel_access_token"],
+            secret["channel_secret"].encode("utf-8"),
+            now,
+        )
+
+    return line_credentials[0], line_credentials[1]
+
+
+def verify_signature(body: str, signature: str) -> bool:
+    """
+    LINE Webhookの署名を検証する（定数時間比較）
+
+    Args:
+        body: リクエストボディ
+        signature: x-line-signature ヘッダーの値
+
+    Returns:
+        署名が正しければTrue
+    """
+    _, channel_secret = get_line_credentials()
+    digest = hmac.new(channel_secret, body.encode("utf-8"), hashlib.sha256).digest()
+    try:
+        return hmac.compare_digest(base64.b64decode(signature), digest)
+    except ValueError:
+        return False
 
 
 def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
@@ -68,28 +161,61 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     logger.info(f"Received webhook: {body}")
 
-    try:
-        handler.handle(body, signature)
-    except InvalidSignatureError:
+    # イベントをパースする前に署名を検証し、不正なリクエストは即座に拒否
+    if not verify_signature(body, signature):
         logger.error("Invalid signature")
-        return {"statusCode": 400, "body": json.dumps("Invalid signature")}
+        return {"statusCode": 400, "body": INVALID_SIGNATURE_BODY}
+
+    try:
+        # 署名検証済みのボディを一度だけパースし、テキストメッセージをユーザーごとにまとめる
+        messages_by_user: dict[str, list[dict[str, Any]]] = {}
+        for webhook_event in json.loads(body).get("events", []):
+            if (
+                webhook_event.get("type") == "message"
+                and webhook_event.get("message", {}).get("type") == "text"
+            ):
+                # グループ・トークルームではユーザーが同意していないとuserIdが含まれない
+                user_id = webhook_event.get("source", {}).get("userId")
+                if not user_id:
+                    logger.warning("Skipping text message without userId")
+                    continue
+                messages_by_user.setdefault(user_id, []).append(webhook_event)
+
+        # 同じユーザーのメッセージは順番に、異なるユーザーのメッセージは並行して処理する
+        if len(messages_by_user) <= 1:
+            for user_events in messages_by_user.values():
+                handle_user_messages(user_events)
+        else:
+            list(message_executor.map(handle_user_messages, messages_by_user.values()))
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
         return {"statusCode": 500, "body": json.dumps(f"Error: {str(e)}")}
 
-    return {"statusCode": 200, "body": json.dumps("OK")}
+    return {"statusCode": 200, "body": OK_BODY}
 
 
-@handler.add(MessageEvent, message=TextMessageContent)
-def handle_text_message(event: MessageEvent) -> None:
+def handle_user_messages(events: list[dict[str, Any]]) -> None:
+    """
+    1人のユーザーのテキストメッセージを受信順に処理する
+
+    同じユーザーのRuntimeセッションに対して同時に呼び出さないよう、順番に処理する
+
+    Args:
+        events: 同じユーザーのLINEメッセージイベント
+    """
+    for event in events:
+        handle_text_message(event)
+
+
+def handle_text_message(event: dict[str, Any]) -> None:
     """
     テキストメッセージの処理
 
     Args:
-        event: LINEメッセージイベント
+        event: LINEメッセージイベント（Webhookボディのevents要素）
     """
-    user_id = event.source.user_id
-    user_message = event.message.text
+    user_id = event["source"]["userId"]
+    user_message = event["message"]["text"]
 
     logger.info(f"User {user_id} sent: {user_message}")
 
@@ -98,25 +224,62 @@ def handle_text_message(event: MessageEvent) -> None:
         response_text = invoke_agent_runtime(user_message, user_id)
 
         # LINEに応答
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[TextMessage(text=response_text)],
-                )
-            )
+        reply_text(event["replyToken"], response_text)
 
     except Exception as e:
         logger.error(f"Error processing message: {e}", exc_info=True)
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[TextMessage(text="申し訳ございません。エラーが発生しました。")],
-                )
-            )
+        reply_text(event["replyToken"], "申し訳ございません。エラーが発生しました。")
+
+
+def get_messaging_api() -> Any:
+    """
+    LINE Messaging APIクライアントを取得する
+
+    Returns:
+        MessagingApi
+    """
+    access_token, _ = get_line_credentials()
+    return build_messaging_api(access_token)
+
+
+@lru_cache(maxsize=1)
+def build_messaging_api(access_token: str) -> Any:
+    """
+    LINE Messaging APIクライアントを構築する
+
+    初回呼び出し時に構築し、ウォームコンテナでは同じクライアント
+    （api-data.line.meへのHTTP接続プール）を再利用する
+    アクセストークンがローテーションされた場合だけ作り直す
+
+    Args:
+        access_token: チャネルアクセストークン
+
+    Returns:
+        MessagingApi
+    """
+    # linebot.v3.messagingは読み込みが重いため、コールドスタート時ではなく初回応答時にインポートする
+    from linebot.v3.messaging import ApiClient, Configuration, MessagingApi
+
+    configuration = Configuration(access_token=access_token)
+    return MessagingApi(ApiClient(configuration))
+
+
+def reply_text(reply_token: str, text: str) -> None:
+    """
+    LINEにテキストメッセージで応答する
+
+    Args:
+        reply_token: 応答用トークン
+        text: 送信するテキスト
+    """
+    from linebot.v3.messaging import ReplyMessageRequest, TextMessage
+
+    get_messaging_api().reply_message(
+        ReplyMessageRequest(
+            reply_token=reply_token,
+            messages=[TextMessage(text=text)],
+        )
+    )
 
 
 def store_oauth_session(session_id: str, line_user_id: str, cognito_token: str) -> None:
@@ -128,16 +291,15 @@ def store_oauth_session(session_id: str, line_user_id: str, cognito_token: str)
         line_user_id: LINE User ID
         cognito_token: Cognito JWT access token
     """
-    import time
-
     try:
-        session_table.put_item(
+        dynamodb.put_item(
+            TableName=OAUTH_SESSION_TABLE_NAME,
             Item={
-                "session_id": session_id,
-                "line_user_id": line_user_id,
-                "cognito_token": cognito_token,
-                "ttl": int(time.time()) + 600,  # 10分後に自動削除
-            }
+                "session_id": {"S": session_id},
+                "line_user_id": {"S": line_user_id},
+                "cognito_token": {"S": cognito_token},
+                "ttl": {"N": str(int(time.time()) + OAUTH_SESSION_TTL_SECONDS)},  # 10分後に自動削除
+            },
         )
         logger.info(f"Stored OAuth session: session_id={session_id}, line_user_id={line_user_id}")
     except Exception as e:
@@ -155,22 +317,14 @@ def extract_auth_url(response_text: str) -> str | None:
     Returns:
         認証URL（見つからない場合はNone）
     """
-    import re
-
-    # パターン1: "Authorization URL: https://..."
-    match = re.search(r"Authorization URL:\s*(https?://[^\s]+)", response_text)
-    if match:
-        return match.group(1)
-
-    # パターン2: "認証してください: https://..."
-    match = re.search(r"認証してください[：:]\s*(https?://[^\s]+)", response_text)
-    if match:
-        return match.group(1)
+    # どのパターンもURLを含むため、URLがない通常の応答は正規表現を使わずに終える
+    if "http" not in response_text:
+        return None
 
-    # パターン3: URLのみ（https://accounts.google.com/... など）
-    match = re.search(r"(https://accounts\.google\.com/[^\s]+)", response_text)
-    if match:
-        return match.group(1)
+    for pattern in AUTH_URL_PATTERNS:
+        match = pattern.search(response_text)
+        if match:
+            return match.group(1)
 
     return None
 
@@ -185,28 +339,10 @@ def extract_session_id_from_url(auth_url: str) -> str | None:
     Returns:
         session_id（見つからない場合はNone）
     """
-    import re
-    from urllib.parse import parse_qs, urlparse
-
-    # URLをパースしてクエリパラメータを取得
-    parsed = urlparse(auth_url)
-    query_params = parse_qs(parsed.query)
-
-    # state パラメータから session_id を抽出
-    if "state" in query_params:
-        state = query_params["state"][0]
-        # state 内の session_id を抽出（形式: session_id=xxx）
-        match = re.search(r"session_id=([^&]+)", state)
-        if match:
-            return match.group(1)
-
-    # redirect_uri パラメータから session_id を抽出
-    if "redirect_uri" in query_params:
-        redirect_uri = query_params["redirect_uri"][0]
-        # redirect_uri に session_id が含まれている場合
-        match = re.search(r"session_id=([^&]+)", redirect_uri)
-        if match:
-            return match.group(1)
+    # クエリ全体をパースせず、URLに対して直接マッチさせてから値だけデコードする
+    match = SESSION_ID_PATTERN.search(auth_url)
+    if match:
+        return urllib.parse.unquote(match.group(1))
 
     logger.warning(f"Failed to extract session_id from auth URL: {auth_url}")
     return None
@@ -231,14 +367,8 @@ def invoke_agent_runtime(input_text: str, user_id: str) -> str:
 
         logger.info("JWT token retrieved successfully")
 
-        # Runtime ARNをURLエンコード
-        escaped_agent_arn = urllib.parse.quote(AGENT_RUNTIME_ARN, safe='')
-
-        # Runtime URLを構築（JWT認証の場合の正しい形式）
-        runtime_url = f"https://bedrock-agentcore.{AWS_REGION}.amazonaws.com/runtimes/{escaped_agent_arn}/invocations?qualifier=DEFAULT"
-
-        # ペイロードを準備
-        payload = {"prompt": input_text}
+        # ペイロードを準備（キーが1つだけなのでユーザー入力のエスケープ以外はdictを経由せず組み立てる）
+        payload = b'{"prompt":' + json.dumps(input_text, ensure_ascii=False).encode("utf-8") + b"}"
 
         # HTTPSリクエストヘッダー（JWT Bearer Token使用）
         headers = {
@@ -247,14 +377,14 @@ def invoke_agent_runtime(input_text: str, user_id: str) -> str:
             "X-Amzn-Bedrock-AgentCore-Runtime-Session-Id": f"line-session-{user_id}",
         }
 
-        logger.info(f"Invoking Runtime with JWT auth: {runtime_url}")
+        logger.info(f"Invoking Runtime with JWT auth: {RUNTIME_URL}")
 
         # AgentCore Runtimeを呼び出し
-        response = requests.post(
-            runtime_url,
+        response = runtime_http.post(
+            RUNTIME_URL,
             headers=headers,
-            json=payload,
-            timeout=120,
+            data=payload,
+            timeout=RUNTIME_TIMEOUT,
         )
 
         # レスポンスをチェック
@@ -277,8 +407,9 @@ def invoke_agent_runtime(input_text: str, user_id: str) -> str:
             session_id = extract_session_id_from_url(auth_url)
             if session_id:
                 # OAuth セッション情報を DynamoDB に保存
+                # 保存前に認証URLを送るとコールバックでセッションが見つからないため、
+                # 応答を返す前に完了を待ち、失敗した場合はエラー応答に回す
                 store_oauth_session(session_id, user_id, jwt_token)
-                logger.info(f"OAuth session stored for session_id: {session_id}")
             else:
                 logger.warning("Failed to extract session_id from auth URL")
 
@@ -302,3 +433,26 @@ def invoke_agent_runtime(input_text: str, user_id: str) -> str:
     except Exception as e:
         logger.error(f"Error invoking agent runtime: {e}", exc_info=True)
         raise
+
+
+def prewarm_connections() -> None:
+    """
+    AgentCore RuntimeとLINE APIへの接続を事前に確立する（ベストエフォート）
+
+    コールドスタート後の最初のメッセージでは、Cognito認証やRuntimeの応答を待つ間に
+    TLSハンドシェイクとMessaging APIの読み込みを済ませておく
+    """
+    try:
+        runtime_http.head(f"https://bedrock-agentcore.{AWS_REGION}.amazonaws.com/", timeout=2)
+    except Exception as e:
+        logger.debug(f"Runtime prewarm failed: {e}")
+
+    try:
+        get_messaging_api().get_bot_info()
+    except Exception as e:
+        logger.debug(f"LINE API prewarm failed: {e}")
+
+
+# 初期化時にLINE認証情報を取得し、バックグラウンドで接続を温めておく
+get_line_credentials()
+background_executor.submit(prewarm_connections)
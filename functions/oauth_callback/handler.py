@@ -10,16 +10,116 @@ from typing import Any
 
 import boto3
 from bedrock_agentcore.services.identity import IdentityClient, UserTokenIdentifier
-
-# AWS clients
-dynamodb = boto3.resource("dynamodb")
+from botocore.config import Config
+
+# 共通のboto3設定: TCP keep-aliveで接続を再利用し、タイムアウトは短めにしてLambdaを長時間ブロックしない
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=10,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+
+# AWS clients（項目の形が固定なので、resourceの型変換を経由せずclientを直接使う）
+dynamodb = boto3.client("dynamodb", config=BOTO_CONFIG)
 table_name = os.environ.get("OAUTH_SESSION_TABLE_NAME", "line-agent-oauth-sessions")
-session_table = dynamodb.Table(table_name)
 
 # AgentCore Identity client (AWS_REGION is automatically set by Lambda runtime)
 region = os.environ.get("AWS_REGION", "ap-northeast-1")
 identity_client = IdentityClient(region=region)
 
+# HTMLレスポンスのヘッダー
+HTML_HEADERS = {"Content-Type": "text/html; charset=utf-8"}
+
+# session_id パラメータがない場合のHTML
+NO_SESSION_ID_HTML = """
+<html>
+    <head><title>エラー</title></head>
+    <body>
+        <h1>❌ エラー</h1>
+        <p>session_id パラメータが見つかりません。</p>
+    </body>
+</html>
+"""
+
+# セッションが見つからない場合のHTML
+SESSION_NOT_FOUND_HTML = """
+<html>
+    <head><title>エラー</title></head>
+    <body>
+        <h1>❌ セッションが見つかりません</h1>
+        <p>セッションが期限切れか、無効です。</p>
+        <p>LINEに戻って再度お試しください。</p>
+    </body>
+</html>
+"""
+
+# 認証完了時のHTML
+SUCCESS_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>認証完了</title>
+    <style>
+        body {
+            margin: 0;
+            padding: 0;
+            height: 100vh;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        }
+        .container {
+            text-align: center;
+            padding: 3rem;
+            background-color: white;
+            border-radius: 20px;
+            box-shadow: 0 10px 40px rgba(0, 0, 0, 0.2);
+            max-width: 500px;
+        }
+        h1 {
+            color: #28a745;
+            margin: 0 0 1rem 0;
+            font-size: 2.5rem;
+        }
+        p {
+            color: #555;
+            font-size: 1.2rem;
+            line-height: 1.6;
+            margin: 1rem 0;
+        }
+        .icon {
+            font-size: 5rem;
+            margin-bottom: 1rem;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="icon">✅</div>
+        <h1>認証完了！</h1>
+        <p>Google Calendar との連携が完了しました。</p>
+        <p>LINEに戻って、再度カレンダー操作をお試しください。</p>
+    </div>
+</body>
+</html>
+"""
+
+# エラー発生時のHTML（{error}にエラー内容を埋め込む）
+ERROR_HTML_TEMPLATE = """
+<html>
+    <head><title>エラー</title></head>
+    <body>
+        <h1>❌ エラーが発生しました</h1>
+        <p>{error}</p>
+        <p>LINEに戻って再度お試しください。</p>
+    </body>
+</html>
+"""
+
 
 def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     """
@@ -34,6 +134,10 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     Returns:
         HTML レスポンス（認証完了メッセージ）
     """
+    # ウォームアップ用の定期実行は実行環境を維持するだけで何もしない
+    if event.get("warmer"):
+        return {"statusCode": 200, "body": "warm"}
+
     print(f"[DEBUG] Received event: {json.dumps(event)}")
 
     # session_id を取得
@@ -43,113 +147,50 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     if not session_id:
         return {
             "statusCode": 400,
-            "headers": {"Content-Type": "text/html; charset=utf-8"},
-            "body": """
-                <html>
-                    <head><title>エラー</title></head>
-                    <body>
-                        <h1>❌ エラー</h1>
-                        <p>session_id パラメータが見つかりません。</p>
-                    </body>
-                </html>
-            """,
+            "headers": HTML_HEADERS,
+            "body": NO_SESSION_ID_HTML,
         }
 
     try:
-        # DynamoDB から LINE user_id と Cognito token を取得
-        response = session_table.get_item(Key={"session_id": session_id})
+        # DynamoDB から LINE user_id と Cognito token を取得し、同時にセッションを削除（1往復）
+        response = dynamodb.delete_item(
+            TableName=table_name,
+            Key={"session_id": {"S": session_id}},
+            ReturnValues="ALL_OLD",
+        )
 
-        if "Item" not in response:
+        item = response.get("Attributes")
+        if not item:
             print(f"[ERROR] Session not found: {session_id}")
             return {
                 "statusCode": 404,
-                "headers": {"Content-Type": "text/html; charset=utf-8"},
-                "body": """
-                    <html>
-                        <head><title>エラー</title></head>
-                        <body>
-                            <h1>❌ セッションが見つかりません</h1>
-                            <p>セッションが期限切れか、無効です。</p>
-                            <p>LINEに戻って再度お試しください。</p>
-                        </body>
-                    </html>
-                """,
+                "headers": HTML_HEADERS,
+                "body": SESSION_NOT_FOUND_HTML,
             }
 
-        item = response["Item"]
-        line_user_id = item["line_user_id"]
-        cognito_token = item["cognito_token"]
+        line_user_id = item["line_user_id"]["S"]
+        cognito_token = item["cognito_token"]["S"]
 
-        print(f"[INFO] Session found: line_user_id={line_user_id}")
+        print(f"[INFO] Session found and deleted: line_user_id={line_user_id}")
 
         # OAuth フローを完了（AgentCore Identity に通知）
         user_identifier = UserTokenIdentifier(user_token=cognito_token)
-        identity_client.complete_resource_token_auth(
-            session_uri=session_id, user_identifier=user_identifier
-        )
+        try:
+            identity_client.complete_resource_token_auth(
+                session_uri=session_id, user_identifier=user_identifier
+            )
+        except Exception:
+            # 失敗した場合はリトライできるようにセッションを元に戻す
+            dynamodb.put_item(TableName=table_name, Item=item)
+            raise
 
         print(f"[SUCCESS] OAuth flow completed for line_user_id={line_user_id}")
 
-        # DynamoDB からセッションを削除（クリーンアップ）
-        session_table.delete_item(Key={"session_id": session_id})
-        print(f"[INFO] Session deleted: {session_id}")
-
         # 成功レスポンス
         return {
             "statusCode": 200,
-            "headers": {"Content-Type": "text/html; charset=utf-8"},
-            "body": """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="utf-8">
-                    <title>認証完了</title>
-                    <style>
-                        body {
-                            margin: 0;
-                            padding: 0;
-                            height: 100vh;
-                            display: flex;
-                            justify-content: center;
-                            align-items: center;
-                            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-                            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        }
-                        .container {
-                            text-align: center;
-                            padding: 3rem;
-                            background-color: white;
-                            border-radius: 20px;
-                            box-shadow: 0 10px 40px rgba(0, 0, 0, 0.2);
-                            max-width: 500px;
-                        }
-                        h1 {
-                            color: #28a745;
-                            margin: 0 0 1rem 0;
-                            font-size: 2.5rem;
-                        }
-                        p {
-                            color: #555;
-                            font-size: 1.2rem;
-                            line-height: 1.6;
-                            margin: 1rem 0;
-                        }
-                        .icon {
-                            font-size: 5rem;
-                            margin-bottom: 1rem;
-                        }
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="icon">✅</div>
-                        <h1>認証完了！</h1>
-                        <p>Google Calendar との連携が完了しました。</p>
-                        <p>LINEに戻って、再度カレンダー操作をお試しください。</p>
-                    </div>
-                </body>
-                </html>
-            """,
+            "headers": HTML_HEADERS,
+            "body": SUCCESS_HTML,
         }
 
     except Exception as e:
@@ -160,15 +201,6 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
         return {
             "statusCode": 500,
-            "headers": {"Content-Type": "text/html; charset=utf-8"},
-            "body": f"""
-                <html>
-                    <head><title>エラー</title></head>
-                    <body>
-                        <h1>❌ エラーが発生しました</h1>
-                        <p>{str(e)}</p>
-                        <p>LINEに戻って再度お試しください。</p>
-                    </body>
-                </html>
-            """,
+            "headers": HTML_HEADERS,
+            "body": ERROR_HTML_TEMPLATE.format(error=str(e)),
         }
@@ -70,12 +70,14 @@ lambda_stack = LambdaStack(
 agentcore_stack = AgentCoreStack(
     app,
     "LineAgentAgentCoreStack",
-    lambda_function_arn=lambda_stack.calendar_function.function_arn,
+    calendar_function_name=lambda_stack.calendar_function_name,
     line_secret=secrets_stack.line_secret,
     cognito_user_pool_id=cognito_stack.user_pool.user_pool_id,
     cognito_app_client_id=cognito_stack.app_client.user_pool_client_id,
     cognito_discovery_url=cognito_stack.user_pool.user_pool_provider_url,
     env=env,
+    # アセットを持たないスタックのため、BootstrapVersionのパラメータとルールを生成しない
+    synthesizer=cdk.DefaultStackSynthesizer(generate_bootstrap_version_rule=False),
     description="AgentCore Runtime and Gateway configuration with JWT authentication",
 )
 
@@ -5,13 +5,123 @@ AgentCore RuntimeとGatewayの設定を行うスタック
 GatewayとLambda TargetをCDKで完全に定義します。
 """
 
-from aws_cdk import CfnOutput, Stack
+from aws_cdk import CfnOutput, Fn, Stack
 from aws_cdk import aws_bedrockagentcore as bedrockagentcore
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_secretsmanager as secretsmanager
 from constructs import Construct
 
 
+# 予定の取得範囲を表すプロパティ
+LIST_PROPERTIES = {
+    "time_min": {"type": "string", "description": "取得開始日時（ISO 8601形式）"},
+    "time_max": {"type": "string", "description": "取得終了日時（ISO 8601形式）"},
+    "max_results": {"type": "number", "description": "最大取得件数"},
+}
+
+# 予定の内容を表すプロパティ（作成・更新で共通）
+EVENT_PROPERTIES = {
+    "summary": {"type": "string", "description": "予定のタイトル"},
+    "start_time": {"type": "string", "description": "開始日時（ISO 8601形式）"},
+    "end_time": {"type": "string", "description": "終了日時（ISO 8601形式）"},
+    "description": {"type": "string", "description": "予定の説明"},
+    "location": {"type": "string", "description": "場所"},
+}
+
+# Calendar操作ツールの定義: (ツール名, 説明, 入力スキーマ)
+CALENDAR_TOOL_SPECS = (
+    (
+        "list_calendar_events",
+        "カレンダーの予定を取得する",
+        {"type": "object", "properties": LIST_PROPERTIES},
+    ),
+    (
+        "create_calendar_event",
+        "カレンダーに予定を作成する",
+        {
+            "type": "object",
+            "properties": EVENT_PROPERTIES,
+            "required": ["summary", "start_time", "end_time"],
+        },
+    ),
+    (
+        "update_calendar_event",
+        "カレンダーの予定を更新する",
+        {
+            "type": "object",
+            "properties": {
+                "event_id": {"type": "string", "description": "更新する予定のID"},
+                **EVENT_PROPERTIES,
+            },
+            "required": ["event_id"],
+        },
+    ),
+    (
+        "delete_calendar_event",
+        "カレンダーの予定を削除する",
+        {
+            "type": "object",
+            "properties": {
+                "event_id": {"type": "string", "description": "削除する予定のID"},
+            },
+            "required": ["event_id"],
+        },
+    ),
+    (
+        "batch_calendar_operations",
+        "複数の予定の一覧・取得・作成・更新・削除を1回のリクエストでまとめて実行する",
+        {
+            "type": "object",
+            "properties": {
+                "operations": {
+                    "type": "array",
+                    "description": "実行する操作のリスト（最大50件）",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "action": {
+                                "type": "string",
+                                "description": "操作の種類（list/get/create/update/delete）",
+                            },
+                            **LIST_PROPERTIES,
+                            "event_id": {"type": "string", "description": "対象の予定のID"},
+                            **EVENT_PROPERTIES,
+                        },
+                        "required": ["action"],
+                    },
+                },
+            },
+            "required": ["operations"],
+        },
+    ),
+)
+
+
+def _to_schema_definition(schema: dict) -> bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty:
+    """
+    JSON Schema形式のdictをGatewayTargetのSchemaDefinitionに変換する
+
+    Args:
+        schema: type, description, properties, items, requiredを持つdict
+
+    Returns:
+        SchemaDefinitionProperty
+    """
+    properties = schema.get("properties")
+    items = schema.get("items")
+    return bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
+        type=schema["type"],
+        description=schema.get("description"),
+        properties=(
+            {name: _to_schema_definition(prop) for name, prop in properties.items()}
+            if properties
+            else None
+        ),
+        items=_to_schema_definition(items) if items else None,
+        required=schema.get("required"),
+    )
+
+
 class AgentCoreStack(Stack):
     """AgentCore RuntimeとGatewayを管理するスタック"""
 
@@ -19,7 +129,7 @@ class AgentCoreStack(Stack):
         self,
         scope: Construct,
         construct_id: str,
-        lambda_function_arn: str,
+        calendar_function_name: str,
         line_secret: secretsmanager.ISecret,
         cognito_user_pool_id: str,
         cognito_app_client_id: str,
@@ -31,7 +141,7 @@ class AgentCoreStack(Stack):
         Args:
             scope: CDKスコープ
             construct_id: コンストラクトID
-            lambda_function_arn: Calendar操作Lambda関数のARN
+            calendar_function_name: Calendar操作Lambda関数の名前
             line_secret: LINE認証情報のSecret
             cognito_user_pool_id: Cognito User Pool ID
             cognito_app_client_id: Cognito App Client ID
@@ -41,33 +151,48 @@ class AgentCoreStack(Stack):
         """
         super().__init__(scope, construct_id, **kwargs)
 
+        # 権限を付与するリソースのARN（このアカウント・リージョンに限定する）
+        ecr_repository_name = "line-agent-secretary"
+        lambda_function_arn = f"arn:aws:lambda:{self.region}:{self.account}:function:{calendar_function_name}"
+        agentcore_resources_arn = f"arn:aws:bedrock-agentcore:{self.region}:{self.account}:*"
+        ecr_repository_arn = f"arn:aws:ecr:{self.region}:{self.account}:repository/{ecr_repository_name}"
+        # AgentCore Identityが管理するSecret（bedrock-agentcore-identity!default/oauth2/...）
+        agentcore_secrets_arn = f"arn:aws:secretsmanager:{self.region}:{self.account}:secret:bedrock-agentcore*"
+        runtime_log_group_arn = f"arn:aws:logs:{self.region}:{self.account}:log-group:/aws/bedrock-agentcore/runtimes/*"
+        # Claudeモデル（globalのクロスリージョン推論ではリージョンなしのARNになるため、リージョンは*）
+        bedrock_model_arns = [
+            "arn:aws:bedrock:*::foundation-model/anthropic.*",
+            f"arn:aws:bedrock:*:{self.account}:inference-profile/*anthropic.*",
+        ]
+
         # AgentCore Gateway用のサービスロール
+        # 権限はPolicyDocumentにまとめて、ロール作成時にインラインポリシーとして付与する
         gateway_role = iam.Role(
             self,
             "GatewayServiceRole",
             assumed_by=iam.ServicePrincipal("bedrock-agentcore.amazonaws.com"),
             description="Service role for AgentCore Gateway",
-        )
-
-        # Lambda関数を呼び出す権限を追加
-        gateway_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=["lambda:InvokeFunction"],
-                resources=[lambda_function_arn],
-            )
-        )
-
-        # AgentCore Identity OAuth2 Credential Providerへのアクセス権限
-        gateway_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "bedrock-agentcore-control:GetOauth2CredentialProvider",
-                    "bedrock-agentcore-control:GetResourceOauth2Token",
-                ],
-                resources=["*"],  # 本番環境では適切なARNに制限すること
-            )
+            inline_policies={
+                "GatewayPolicy": iam.PolicyDocument(
+                    statements=[
+                        # Lambda関数を呼び出す権限を追加
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=["lambda:InvokeFunction"],
+                            resources=[lambda_function_arn],
+                        ),
+                        # AgentCore Identity OAuth2 Credential Providerへのアクセス権限
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "bedrock-agentcore-control:GetOauth2CredentialProvider",
+                                "bedrock-agentcore-control:GetResourceOauth2Token",
+                            ],
+                            resources=[agentcore_resources_arn],
+                        ),
+                    ]
+                ),
+            },
         )
 
         # AgentCore Runtime用のIAMロール
@@ -76,96 +201,95 @@ class AgentCoreStack(Stack):
             "RuntimeExecutionRole",
             assumed_by=iam.ServicePrincipal("bedrock-agentcore.amazonaws.com"),
             description="Execution role for AgentCore Runtime",
-        )
-
-        # AgentCore Gatewayへのアクセス権限
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "bedrock-agentcore:InvokeGateway",
-                    "bedrock-agentcore:GetGateway",
-                    "bedrock-agentcore:ListGateways",
-                    "bedrock-agentcore:ListGatewayTargets",
-                    "bedrock-agentcore-control:ListGateways",
-                    "bedrock-agentcore-control:ListGatewayTargets",
-                    "bedrock-agentcore-control:GetGateway",
-                ],
-                resources=["*"],  # 本番環境では適切なARNに制限すること
-            )
-        )
-
-        # AgentCore Identity - Workload Identity管理とOAuth2 Token取得権限
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "bedrock-agentcore:CreateWorkloadIdentity",
-                    "bedrock-agentcore:GetWorkloadIdentity",
-                    "bedrock-agentcore:GetWorkloadAccessTokenForUserId",
-                    "bedrock-agentcore:GetResourceOauth2Token",
-                ],
-                resources=["*"],  # 本番環境では適切なARNに制限すること
-            )
-        )
-
-        # ECRからDockerイメージを取得する権限
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "ecr:GetAuthorizationToken",
-                    "ecr:BatchGetImage",
-                    "ecr:GetDownloadUrlForLayer",
-                ],
-                resources=["*"],
-            )
-        )
-
-        # CloudWatch Logsへの書き込み権限
-        runtime_role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name(
-                "CloudWatchLogsFullAccess"
-            )
-        )
-
-        # Bedrock Runtimeへのアクセス権限（Claude 3.5 Sonnetなどのモデルを呼び出すため）
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "bedrock:InvokeModel",
-                    "bedrock:InvokeModelWithResponseStream",
-                ],
-                resources=["*"],  # 本番環境では特定のモデルARNに制限することを推奨
-            )
-        )
-
-        # Lambda関数を呼び出す権限（カレンダー操作）
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=["lambda:InvokeFunction"],
-                resources=[lambda_function_arn],
-            )
+            inline_policies={
+                "RuntimePolicy": iam.PolicyDocument(
+                    statements=[
+                        # CloudWatch Logsへの書き込み権限（Runtimeのロググループに限定）
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "logs:CreateLogGroup",
+                                "logs:DescribeLogStreams",
+                                "logs:CreateLogStream",
+                                "logs:PutLogEvents",
+                            ],
+                            resources=[runtime_log_group_arn, f"{runtime_log_group_arn}:log-stream:*"],
+                        ),
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=["logs:DescribeLogGroups"],
+                            resources=[f"arn:aws:logs:{self.region}:{self.account}:log-group:*"],
+                        ),
+                        # AgentCore Gateway・Workload Identity・OAuth2 Token取得の権限
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                # AgentCore Gatewayへのアクセス権限
+                                "bedrock-agentcore:InvokeGateway",
+                                "bedrock-agentcore:GetGateway",
+                                "bedrock-agentcore:ListGatewayTargets",
+                                "bedrock-agentcore-control:ListGatewayTargets",
+                                "bedrock-agentcore-control:GetGateway",
+                                # AgentCore Identity - Workload Identity管理とOAuth2 Token取得権限
+                                "bedrock-agentcore:CreateWorkloadIdentity",
+                                "bedrock-agentcore:GetWorkloadIdentity",
+                                "bedrock-agentcore:GetWorkloadAccessTokenForUserId",
+                                "bedrock-agentcore:GetResourceOauth2Token",
+                            ],
+                            resources=[agentcore_resources_arn],
+                        ),
+                        # リソースを指定できない操作（一覧取得・ECR認証トークン）は*のまま
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "bedrock-agentcore:ListGateways",
+                                "bedrock-agentcore-control:ListGateways",
+                                "ecr:GetAuthorizationToken",
+                            ],
+                            resources=["*"],
+                        ),
+                        # ECRからDockerイメージを取得する権限
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "ecr:BatchGetImage",
+                                "ecr:GetDownloadUrlForLayer",
+                            ],
+                            resources=[ecr_repository_arn],
+                        ),
+                        # Bedrock Runtimeへのアクセス権限（Claudeモデルを呼び出すため）
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "bedrock:InvokeModel",
+                                "bedrock:InvokeModelWithResponseStream",
+                            ],
+                            resources=bedrock_model_arns,
+                        ),
+                        # OAuth2 Credential Providerが使用するSecrets Managerへのアクセス権限
+                        # （AgentCore Identityが管理するOAuth2 credentialsにアクセス可能にする）
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "secretsmanager:GetSecretValue",
+                                "secretsmanager:DescribeSecret",
+                            ],
+                            resources=[agentcore_secrets_arn],
+                        ),
+                        # Lambda関数を呼び出す権限（カレンダー操作）
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=["lambda:InvokeFunction"],
+                            resources=[lambda_function_arn],
+                        ),
+                    ]
+                ),
+            },
         )
 
         # Secrets Managerから認証情報を読み取る権限
         line_secret.grant_read(runtime_role)
 
-        # OAuth2 Credential Providerが使用するSecrets Managerへのアクセス権限
-        # AgentCore Identityが管理するOAuth2 credentialsにアクセス可能にする
-        runtime_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "secretsmanager:GetSecretValue",
-                    "secretsmanager:DescribeSecret",
-                ],
-                resources=["*"],  # 本番環境ではAgentCore Identity管理のSecretのARNに制限すること
-            )
-        )
-
         # AgentCore Gateway作成
         gateway = bedrockagentcore.CfnGateway(
             self,
@@ -214,8 +338,12 @@ class AgentCoreStack(Stack):
         calendar_target.add_dependency(gateway)
 
         # AgentCore Runtime作成（JWT認証付き）
-        ecr_repository_name = "line-agent-secretary"
-        ecr_uri = f"{self.account}.dkr.ecr.{self.region}.amazonaws.com/{ecr_repository_name}:latest"
+        # 疑似パラメータはFn::Subで1つの組み込み関数としてCFnに出力する
+        ecr_uri = Fn.sub(
+            "${AWS::AccountId}.dkr.ecr.${AWS::Region}.amazonaws.com/${RepositoryName}:latest",
+            {"RepositoryName": ecr_repository_name},
+        )
+        discovery_url = Fn.join("", [cognito_discovery_url, "/.well-known/openid-configuration"])
 
         runtime = bedrockagentcore.CfnRuntime(
             self,
@@ -233,7 +361,7 @@ class AgentCoreStack(Stack):
             protocol_configuration="HTTP",
             authorizer_configuration=bedrockagentcore.CfnRuntime.AuthorizerConfigurationProperty(
                 custom_jwt_authorizer=bedrockagentcore.CfnRuntime.CustomJWTAuthorizerConfigurationProperty(
-                    discovery_url=f"{cognito_discovery_url}/.well-known/openid-configuration",
+                    discovery_url=discovery_url,
                     allowed_clients=[cognito_app_client_id],
                 )
             ),
@@ -248,63 +376,24 @@ class AgentCoreStack(Stack):
         # RuntimeはGatewayに依存
         runtime.add_dependency(gateway)
 
-        # 出力
-        CfnOutput(
-            self,
-            "GatewayRoleArn",
-            value=gateway_role.role_arn,
-            description="AgentCore Gateway service role ARN",
-            export_name=f"{self.stack_name}-GatewayRoleArn",
-        )
-
-        CfnOutput(
-            self,
-            "RuntimeRoleArn",
-            value=runtime_role.role_arn,
-            description="AgentCore Runtime execution role ARN",
-            export_name=f"{self.stack_name}-RuntimeRoleArn",
-        )
-
-        CfnOutput(
-            self,
-            "RuntimeId",
-            value=runtime.attr_agent_runtime_id,
-            description="AgentCore Runtime ID",
-            export_name=f"{self.stack_name}-RuntimeId",
-        )
-
-        CfnOutput(
-            self,
-            "RuntimeArn",
-            value=runtime.attr_agent_runtime_arn,
-            description="AgentCore Runtime ARN",
-            export_name=f"{self.stack_name}-RuntimeArn",
-        )
-
-        # Gateway関連の出力
-        CfnOutput(
-            self,
-            "GatewayId",
-            value=gateway.attr_gateway_identifier,
-            description="AgentCore Gateway ID",
-            export_name=f"{self.stack_name}-GatewayId",
-        )
-
-        CfnOutput(
-            self,
-            "GatewayUrl",
-            value=gateway.attr_gateway_url,
-            description="AgentCore Gateway MCP URL",
-            export_name=f"{self.stack_name}-GatewayUrl",
-        )
-
-        CfnOutput(
-            self,
-            "CalendarTargetId",
-            value=calendar_target.attr_target_id,
-            description="Calendar operations target ID",
-            export_name=f"{self.stack_name}-CalendarTargetId",
-        )
+        # 出力: (出力ID, 値, 説明)
+        outputs = [
+            ("GatewayRoleArn", gateway_role.role_arn, "AgentCore Gateway service role ARN"),
+            ("RuntimeRoleArn", runtime_role.role_arn, "AgentCore Runtime execution role ARN"),
+            ("RuntimeId", runtime.attr_agent_runtime_id, "AgentCore Runtime ID"),
+            ("RuntimeArn", runtime.attr_agent_runtime_arn, "AgentCore Runtime ARN"),
+            # Gateway関連の出力
+            ("GatewayId", gateway.attr_gateway_identifier, "AgentCore Gateway ID"),
+            ("GatewayUrl", gateway.attr_gateway_url, "AgentCore Gateway MCP URL"),
+            ("CalendarTargetId", calendar_target.attr_target_id, "Calendar operations target ID"),
+        ]
+        for output_id, value, description in outputs:
+            CfnOutput(
+                self,
+                output_id,
+                value=value,
+                description=description,
+            )
 
         # IAMロールとRuntimeを他のスタックから参照できるようにする
         self.gateway_role = gateway_role
@@ -320,107 +409,10 @@ class AgentCoreStack(Stack):
             ToolDefinitionのリスト
         """
         return [
-            # list_calendar_events
-            bedrockagentcore.CfnGatewayTarget.ToolDefinitionProperty(
-                name="list_calendar_events",
-                description="カレンダーの予定を取得する",
-                input_schema=bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                    type="object",
-                    properties={
-                        "time_min": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="取得開始日時（ISO 8601形式）",
-                        ),
-                        "time_max": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="取得終了日時（ISO 8601形式）",
-                        ),
-                        "max_results": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="number",
-                            description="最大取得件数",
-                        ),
-                    },
-                ),
-            ),
-            # create_calendar_event
-            bedrockagentcore.CfnGatewayTarget.ToolDefinitionProperty(
-                name="create_calendar_event",
-                description="カレンダーに予定を作成する",
-                input_schema=bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                    type="object",
-                    properties={
-                        "summary": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="予定のタイトル",
-                        ),
-                        "start_time": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="開始日時（ISO 8601形式）",
-                        ),
-                        "end_time": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="終了日時（ISO 8601形式）",
-                        ),
-                        "description": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="予定の説明",
-                        ),
-                        "location": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="場所",
-                        ),
-                    },
-                    required=["summary", "start_time", "end_time"],
-                ),
-            ),
-            # update_calendar_event
-            bedrockagentcore.CfnGatewayTarget.ToolDefinitionProperty(
-                name="update_calendar_event",
-                description="カレンダーの予定を更新する",
-                input_schema=bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                    type="object",
-                    properties={
-                        "event_id": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="更新する予定のID",
-                        ),
-                        "summary": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="予定のタイトル",
-                        ),
-                        "start_time": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="開始日時（ISO 8601形式）",
-                        ),
-                        "end_time": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="終了日時（ISO 8601形式）",
-                        ),
-                        "description": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="予定の説明",
-                        ),
-                        "location": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="場所",
-                        ),
-                    },
-                    required=["event_id"],
-                ),
-            ),
-            # delete_calendar_event
             bedrockagentcore.CfnGatewayTarget.ToolDefinitionProperty(
-                name="delete_calendar_event",
-                description="カレンダーの予定を削除する",
-                input_schema=bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                    type="object",
-                    properties={
-                        "event_id": bedrockagentcore.CfnGatewayTarget.SchemaDefinitionProperty(
-                            type="string",
-                            description="削除する予定のID",
-                        ),
-                    },
-                    required=["event_id"],
-                ),
-            ),
+                name=name,
+                description=description,
+                input_schema=_to_schema_definition(input_schema),
+            )
+            for name, description, input_schema in CALENDAR_TOOL_SPECS
         ]
@@ -76,7 +76,6 @@ class CognitoStack(Stack):
             "UserPoolId",
             value=self.user_pool.user_pool_id,
             description="Cognito User Pool ID",
-            export_name="LineAgentUserPoolId",
         )
 
         CfnOutput(
@@ -84,7 +83,6 @@ class CognitoStack(Stack):
             "UserPoolArn",
             value=self.user_pool.user_pool_arn,
             description="Cognito User Pool ARN",
-            export_name="LineAgentUserPoolArn",
         )
 
         CfnOutput(
@@ -92,7 +90,6 @@ class CognitoStack(Stack):
             "AppClientId",
             value=self.app_client.user_pool_client_id,
             description="Cognito App Client ID",
-            export_name="LineAgentAppClientId",
         )
 
         CfnOutput(
@@ -100,5 +97,4 @@ class CognitoStack(Stack):
             "ProviderUrl",
             value=self.user_pool.user_pool_provider_url,
             description="Cognito OIDC Discovery URL",
-            export_name="LineAgentProviderUrl",
         )
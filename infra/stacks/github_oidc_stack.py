@@ -41,12 +41,7 @@ class GitHubOIDCStack(Stack):
             "GitHubOIDCProvider",
             url="https://token.actions.githubusercontent.com",
             client_ids=["sts.amazonaws.com"],
-            thumbprints=[
-                # GitHub Actions OIDC thumbprint
-                # 参考: https://github.blog/changelog/2023-06-27-github-actions-update-on-oidc-integration-with-aws/
-                "6938fd4d98bab03faadb97b34396831e3780aea1",
-                "1c58a3a8518e8759bf075b76b750d4f2df264fcd",
-            ],
+            # thumbprintsは指定しない（STSはGitHubの証明書を信頼済みルートCAで検証するため使われない）
         )
 
         # GitHub Actions用のIAMロール
@@ -105,7 +100,6 @@ class GitHubOIDCStack(Stack):
             "GitHubActionsRoleArn",
             value=github_role.role_arn,
             description="GitHub Actions用のIAMロールARN（GitHub Secretsに設定してください）",
-            export_name=f"{self.stack_name}-GitHubActionsRoleArn",
         )
 
         CfnOutput(
@@ -113,7 +107,6 @@ class GitHubOIDCStack(Stack):
             "GitHubOIDCProviderArn",
             value=github_provider.open_id_connect_provider_arn,
             description="GitHub OIDC プロバイダーARN",
-            export_name=f"{self.stack_name}-GitHubOIDCProviderArn",
         )
 
         CfnOutput(
@@ -5,15 +5,22 @@ Google Calendar操作用のLambda関数を定義するスタック
 """
 
 from aws_cdk import (
-    BundlingOptions,
     Duration,
     Stack,
+    aws_cloudwatch as cloudwatch,
+    aws_ecr_assets as ecr_assets,
     aws_iam as iam,
     aws_lambda as lambda_,
+    aws_logs as logs,
 )
 from constructs import Construct
 
 
+# Calendar操作Lambda関数の名前
+# AgentCoreStackはこの名前からARNを組み立てる（スタック間のExport/Importを作らない）
+CALENDAR_FUNCTION_NAME = "line-agent-calendar-operations"
+
+
 class LambdaStack(Stack):
     """Lambda関数を管理するスタック"""
 
@@ -21,6 +28,7 @@ class LambdaStack(Stack):
         super().__init__(scope, construct_id, **kwargs)
 
         # Lambda実行ロールを作成
+        # 権限はPolicyDocumentにまとめて、ロール作成時にインラインポリシーとして付与する
         lambda_role = iam.Role(
             self,
             "CalendarLambdaRole",
@@ -30,59 +38,75 @@ class LambdaStack(Stack):
                     "service-role/AWSLambdaBasicExecutionRole"
                 ),
             ],
+            inline_policies={
+                "CalendarPolicy": iam.PolicyDocument(
+                    statements=[
+                        # AgentCore Identityへのアクセス権限
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "bedrock-agentcore:*",
+                                "bedrock-agentcore-control:*",
+                            ],
+                            resources=["*"],  # 本番環境では適切なARNに制限すること
+                        ),
+                        # Secrets Managerへのアクセス権限（OAuth tokenの取得用）
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "secretsmanager:GetSecretValue",
+                            ],
+                            resources=["*"],  # 本番環境では適切なARNに制限すること
+                        ),
+                    ]
+                ),
+            },
             description="Execution role for Google Calendar operations Lambda",
         )
 
-        # AgentCore Identityへのアクセス権限を追加
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "bedrock-agentcore:*",
-                    "bedrock-agentcore-control:*",
-                ],
-                resources=["*"],  # 本番環境では適切なARNに制限すること
-            )
-        )
-
-        # Secrets Managerへのアクセス権限を追加（OAuth tokenの取得用）
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                effect=iam.Effect.ALLOW,
-                actions=[
-                    "secretsmanager:GetSecretValue",
-                ],
-                resources=["*"],  # 本番環境では適切なARNに制限すること
-            )
-        )
+        # ロググループ（コールドスタート計測のメトリクスフィルターを設定するため明示的に作成）
+        calendar_log_group = logs.LogGroup(self, "CalendarOperationsLogGroup")
 
         # Google Calendar操作Lambda関数
-        # PythonFunctionを使用して依存関係を自動的にバンドル
-        self.calendar_function = lambda_.Function(
+        # 依存関係はDockerfileのレイヤーに分けてビルドし、ハンドラーの変更時はpip installを再実行しない
+        self.calendar_function = lambda_.DockerImageFunction(
             self,
             "CalendarOperationsFunction",
-            runtime=lambda_.Runtime.PYTHON_3_12,
-            handler="operations.lambda_handler",
-            code=lambda_.Code.from_asset(
+            function_name=CALENDAR_FUNCTION_NAME,
+            code=lambda_.DockerImageCode.from_image_asset(
                 "../functions/calendar",
-                bundling=BundlingOptions(
-                    image=lambda_.Runtime.PYTHON_3_12.bundling_image,
-                    command=[
-                        "bash",
-                        "-c",
-                        "pip install -r requirements.txt -t /asset-output && cp -au . /asset-output",
-                    ],
-                ),
+                platform=ecr_assets.Platform.LINUX_ARM64,
             ),
+            architecture=lambda_.Architecture.ARM_64,
             role=lambda_role,
             timeout=Duration.seconds(30),
             memory_size=256,
+            log_group=calendar_log_group,
+            logging_format=lambda_.LoggingFormat.JSON,
             environment={
                 "CREDENTIAL_PROVIDER_NAME": "google-calendar-provider",
             },
             description="Google Calendar operations function using AgentCore Identity",
         )
 
+        # コールドスタートの初期化時間をメトリクスとして記録する
+        logs.MetricFilter(
+            self,
+            "CalendarInitDurationMetric",
+            log_group=calendar_log_group,
+            filter_pattern=logs.FilterPattern.all(
+                logs.FilterPattern.string_value("$.type", "=", "platform.report"),
+                logs.FilterPattern.number_value("$.record.metrics.initDurationMs", ">", 0),
+            ),
+            metric_namespace="LineAgent",
+            metric_name="CalendarInitDuration",
+            metric_value="$.record.metrics.initDurationMs",
+            unit=cloudwatch.Unit.MILLISECONDS,
+        )
+
+        # 他のスタックに渡す関数名（トークンではなく文字列のため、Exportは生成されない）
+        self.calendar_function_name = CALENDAR_FUNCTION_NAME
+
         # AgentCore Gatewayからの呼び出しを許可
         self.calendar_function.grant_invoke(
             iam.ServicePrincipal("bedrock-agentcore.amazonaws.com")
@@ -95,5 +119,4 @@ class LambdaStack(Stack):
             "CalendarFunctionArn",
             value=self.calendar_function.function_arn,
             description="Calendar operations Lambda function ARN (use as CALENDAR_LAMBDA_ARN in AgentCore Runtime)",
-            export_name=f"{self.stack_name}-CalendarFunctionArn",
         )
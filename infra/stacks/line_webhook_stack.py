@@ -4,16 +4,43 @@ LINE Webhook Stack
 LINE WebhookとAPI Gatewayを管理するスタック
 """
 
+import jsii
 from aws_cdk import CfnOutput, Duration, Stack
 from aws_cdk import aws_apigateway as apigw
+from aws_cdk import aws_cloudwatch as cloudwatch
 from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_logs as logs
 from aws_cdk import aws_secretsmanager as secretsmanager
-from aws_cdk.aws_lambda_python_alpha import PythonFunction
+from aws_cdk.aws_lambda_python_alpha import (
+    BundlingOptions,
+    ICommandHooks,
+    PythonFunction,
+    PythonLayerVersion,
+)
 from constructs import Construct
 
 
+@jsii.implements(ICommandHooks)
+class CompileBytecodeHooks:
+    """
+    バンドル後にバイトコードをコンパイルするフック
+
+    アセットのzipはタイムスタンプが固定されるため、pipが生成したタイムスタンプ検証の
+    .pycはLambda上で無効になり、読み取り専用のコード領域では毎回メモリ上で再コンパイルされる
+    ソースのタイムスタンプを検証しない形式でコンパイルし直し、コールドスタート時のコンパイルを省く
+    """
+
+    def before_bundling(self, input_dir: str, output_dir: str) -> list[str]:
+        return []
+
+    def after_bundling(self, input_dir: str, output_dir: str) -> list[str]:
+        return [f"python -m compileall -f -q --invalidation-mode unchecked-hash {output_dir}"]
+
+
 class LineWebhookStack(Stack):
     """LINE WebhookとAPI Gatewayを管理するスタック"""
 
@@ -26,6 +53,7 @@ class LineWebhookStack(Stack):
         cognito_user_pool_id: str,
         cognito_app_client_id: str,
         oauth_session_table: dynamodb.ITable,
+        warmer_enabled: bool = True,
         **kwargs,
     ) -> None:
         """
@@ -37,28 +65,60 @@ class LineWebhookStack(Stack):
             cognito_user_pool_id: Cognito User Pool ID
             cognito_app_client_id: Cognito App Client ID
             oauth_session_table: OAuth Session DynamoDB Table
+            warmer_enabled: OAuth Callback Lambdaを定期実行でウォームに保つかどうか
             **kwargs: その他のスタックパラメータ
         """
         super().__init__(scope, construct_id, **kwargs)
 
+        # ローカルのバイトコードキャッシュをアセットから除外し（アセットハッシュはソースの変更時だけ変わる）、
+        # バンドル時にLambdaのPythonでコンパイルしたバイトコードを含める
+        bundling = BundlingOptions(
+            asset_excludes=["__pycache__", "*.pyc"],
+            command_hooks=CompileBytecodeHooks(),
+        )
+
+        # 両Lambdaで共有する依存関係のLayer（関数ごとのパッケージにはハンドラーのコードだけを含める）
+        shared_deps_layer = PythonLayerVersion(
+            self,
+            "SharedDepsLayer",
+            entry="../functions/shared_deps",
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_12],
+            compatible_architectures=[lambda_.Architecture.ARM_64],
+            bundling=bundling,
+            description="Shared dependencies for LINE Agent Secretary Lambda functions",
+        )
+
+        # Webhookのメモリサイズ（CPU割り当てはメモリに比例し、初期化時のインポートが速くなる）
+        # `cdk deploy -c webhook_memory_mb=1769` のようにcontextで調整できる
+        webhook_memory_mb = int(self.node.try_get_context("webhook_memory_mb") or 1024)
+
+        # ロググループ（コールドスタート計測のメトリクスフィルターを設定するため明示的に作成）
+        webhook_log_group = logs.LogGroup(self, "LineWebhookLogGroup")
+        oauth_callback_log_group = logs.LogGroup(self, "OAuthCallbackLogGroup")
+
         # LINE Webhook Lambda関数
         webhook_function = PythonFunction(
             self,
             "LineWebhookFunction",
             entry="../functions/line_webhook",
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             index="handler.py",
             handler="lambda_handler",
+            bundling=bundling,
             timeout=Duration.seconds(120),  # Increased to 120 seconds
-            memory_size=256,
+            memory_size=webhook_memory_mb,
             environment={
-                "LINE_CHANNEL_ACCESS_TOKEN": line_secret.secret_value_from_json("channel_access_token").unsafe_unwrap(),
-                "LINE_CHANNEL_SECRET": line_secret.secret_value_from_json("channel_secret").unsafe_unwrap(),
+                # 認証情報はテンプレートに埋め込まず、Lambdaの初期化時にSecrets Managerから取得する
+                "LINE_SECRET_ARN": line_secret.secret_arn,
                 "AGENT_RUNTIME_ARN": f"arn:aws:bedrock-agentcore:{self.region}:{self.account}:runtime/{agent_runtime_id}",
                 "COGNITO_USER_POOL_ID": cognito_user_pool_id,
                 "COGNITO_APP_CLIENT_ID": cognito_app_client_id,
                 "OAUTH_SESSION_TABLE_NAME": oauth_session_table.table_name,
             },
+            layers=[shared_deps_layer],
+            log_group=webhook_log_group,
+            logging_format=lambda_.LoggingFormat.JSON,
             description="LINE Webhook handler for LINE Agent Secretary",
         )
 
@@ -68,16 +128,67 @@ class LineWebhookStack(Stack):
             "OAuthCallbackFunction",
             entry="../functions/oauth_callback",
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             index="handler.py",
             handler="lambda_handler",
+            bundling=bundling,
             timeout=Duration.seconds(30),
             memory_size=256,
             environment={
                 "OAUTH_SESSION_TABLE_NAME": oauth_session_table.table_name,
             },
+            layers=[shared_deps_layer],
+            log_group=oauth_callback_log_group,
+            logging_format=lambda_.LoggingFormat.JSON,
             description="OAuth2 callback handler for Google Calendar authentication",
         )
 
+        # Webhookは同期呼び出しでコールドスタートが応答遅延に直結するため、
+        # エイリアス経由でプロビジョニング済み同時実行数を確保する
+        webhook_alias = lambda_.Alias(
+            self,
+            "WebhookAliasLive",
+            alias_name="live",
+            version=webhook_function.current_version,
+        )
+        webhook_alias.add_auto_scaling(min_capacity=1, max_capacity=5).scale_on_utilization(
+            utilization_target=0.6,
+        )
+
+        # OAuth Callbackは呼び出し頻度が低いため、5分ごとの定期実行で実行環境をウォームに保つ
+        if warmer_enabled:
+            warmer = events.Rule(
+                self,
+                "OAuthCallbackWarmer",
+                schedule=events.Schedule.rate(Duration.minutes(5)),
+            )
+            warmer.add_target(
+                targets.LambdaFunction(
+                    oauth_callback_function,
+                    event=events.RuleTargetInput.from_object({"warmer": True}),
+                )
+            )
+
+        # コールドスタートの初期化時間をメトリクスとして記録する
+        # （JSON形式のplatform.reportレコードのうち、initDurationMsを含むものがコールドスタート）
+        for metric_id, log_group, metric_name in [
+            ("WebhookInitDurationMetric", webhook_log_group, "WebhookInitDuration"),
+            ("OAuthCallbackInitDurationMetric", oauth_callback_log_group, "OAuthCallbackInitDuration"),
+        ]:
+            logs.MetricFilter(
+                self,
+                metric_id,
+                log_group=log_group,
+                filter_pattern=logs.FilterPattern.all(
+                    logs.FilterPattern.string_value("$.type", "=", "platform.report"),
+                    logs.FilterPattern.number_value("$.record.metrics.initDurationMs", ">", 0),
+                ),
+                metric_namespace="LineAgent",
+                metric_name=metric_name,
+                metric_value="$.record.metrics.initDurationMs",
+                unit=cloudwatch.Unit.MILLISECONDS,
+            )
+
         # Secrets Managerへの読み取り権限を付与
         line_secret.grant_read(webhook_function)
 
@@ -130,12 +241,24 @@ class LineWebhookStack(Stack):
         )
 
         # Lambda統合（プロキシ統合を使用）
-        webhook_integration = apigw.LambdaIntegration(webhook_function)
+        webhook_integration = apigw.LambdaIntegration(webhook_alias)
         oauth_callback_integration = apigw.LambdaIntegration(oauth_callback_function)
 
         # /webhook エンドポイント
         webhook_resource = api.root.add_resource("webhook")
-        webhook_resource.add_method("POST", webhook_integration)
+        # 署名ヘッダーのないリクエストはAPI Gatewayで400を返し、Lambdaを起動しない
+        webhook_resource.add_method(
+            "POST",
+            webhook_integration,
+            request_parameters={
+                "method.request.header.X-Line-Signature": True,
+                "method.request.header.Content-Type": True,
+            },
+            request_validator_options=apigw.RequestValidatorOptions(
+                request_validator_name="LineWebhookHeaderValidator",
+                validate_request_parameters=True,
+            ),
+        )
 
         # /oauth2/callback エンドポイント
         oauth2_resource = api.root.add_resource("oauth2")
@@ -143,7 +266,7 @@ class LineWebhookStack(Stack):
         callback_resource.add_method("GET", oauth_callback_integration)
 
         # Lambda権限（API Gatewayからの呼び出しを許可）
-        webhook_function.add_permission(
+        webhook_alias.add_permission(
             "ApiGatewayInvoke",
             principal=iam.ServicePrincipal("apigateway.amazonaws.com"),
             action="lambda:InvokeFunction",
@@ -174,7 +297,6 @@ class LineWebhookStack(Stack):
             "WebhookUrl",
             value=f"{api.url}webhook",
             description="LINE Webhook URL (set this in LINE Developers Console)",
-            export_name=f"{self.stack_name}-WebhookUrl",
         )
 
         CfnOutput(
@@ -182,7 +304,6 @@ class LineWebhookStack(Stack):
             "OAuthCallbackUrl",
             value=f"{api.url}oauth2/callback",
             description="OAuth2 Callback URL (register this with AgentCore Workload Identity)",
-            export_name=f"{self.stack_name}-OAuthCallbackUrl",
         )
 
         CfnOutput(
@@ -190,14 +311,13 @@ class LineWebhookStack(Stack):
             "WebhookFunctionName",
             value=webhook_function.function_name,
             description="LINE Webhook Lambda function name",
-            export_name=f"{self.stack_name}-WebhookFunctionName",
         )
 
         CfnOutput(
             self,
             "SetupInstructions",
             value=(
-                "1. Update Lambda environment variables with your LINE credentials\n"
+                "1. Store your LINE credentials in the LINE Secrets Manager secret\n"
                 "2. Set the Webhook URL in LINE Developers Console\n"
                 "3. Enable webhook in LINE Developers Console"
             ),
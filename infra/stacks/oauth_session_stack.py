@@ -43,7 +43,6 @@ class OAuthSessionStack(Stack):
             "OAuthSessionTableName",
             value=self.session_table.table_name,
             description="OAuth Session DynamoDB Table Name",
-            export_name="LineAgentOAuthSessionTableName",
         )
 
         CfnOutput(
@@ -51,5 +50,4 @@ class OAuthSessionStack(Stack):
             "OAuthSessionTableArn",
             value=self.session_table.table_arn,
             description="OAuth Session DynamoDB Table ARN",
-            export_name="LineAgentOAuthSessionTableArn",
         )
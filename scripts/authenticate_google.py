@@ -3,10 +3,17 @@ Google Calendar OAuth2 Authentication Script
 
 このスクリプトを実行して、共有カレンダー用のGoogle認証を完了させます。
 全LINEユーザーが同じGoogleアカウントのカレンダーを共有します。
+
+AgentCore Identityに有効なトークンが保存済みであれば、ブラウザでの認証は行いません。
+再認証したい場合は --force を指定してください。
 """
 
+import argparse
 import asyncio
+import logging
 import time
+from functools import lru_cache
+
 from bedrock_agentcore.services.identity import IdentityClient
 
 # AWS Region
@@ -27,36 +34,64 @@ SCOPES = ["https://www.googleapis.com/auth/calendar"]
 # Callback URL
 CALLBACK_URL = "https://bedrock-agentcore.ap-northeast-1.amazonaws.com/identities/oauth2/callback"
 
+# 出力の区切り線
+SEPARATOR = "=" * 70
+
+# 実行内容の表示（起動時に一度だけ組み立てる）
+BANNER = "\n".join([
+    SEPARATOR,
+    "Google Calendar OAuth2 認証（共有カレンダー）",
+    SEPARATOR,
+    f"Workload: {WORKLOAD_NAME}",
+    f"Provider: {PROVIDER_NAME}",
+    f"User ID: {SHARED_USER_ID} (固定)",
+    f"Region: {AWS_REGION}",
+    f"Scopes: {', '.join(SCOPES)}",
+    SEPARATOR,
+])
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_identity_client() -> IdentityClient:
+    """
+    IdentityClientを取得する
+
+    初回呼び出し時に構築し、以降は同じクライアント（AgentCore Identityへの
+    HTTPS接続プール）を再利用する
+
+    Returns:
+        IdentityClient
+    """
+    return IdentityClient(AWS_REGION)
 
-async def authenticate_google():
-    """Google Calendar認証を実行"""
 
-    print("=" * 70)
-    print("Google Calendar OAuth2 認証（共有カレンダー）")
-    print("=" * 70)
-    print(f"\nWorkload: {WORKLOAD_NAME}")
-    print(f"Provider: {PROVIDER_NAME}")
-    print(f"User ID: {SHARED_USER_ID} (固定)")
-    print(f"Region: {AWS_REGION}")
-    print(f"Scopes: {', '.join(SCOPES)}")
-    print("\n" + "=" * 70)
+async def authenticate_google(force: bool = False):
+    """
+    Google Calendar認証を実行
 
-    # IdentityClient初期化
-    client = IdentityClient(AWS_REGION)
+    Args:
+        force: 保存済みのトークンがあってもブラウザでの認証をやり直すかどうか
+    """
 
-    print("\n📝 ステップ1: Workload Access Token取得中...")
+    logger.info("%s", BANNER)
 
-    # Workload Access Tokenを取得
-    workload_access_token_response = client.get_workload_access_token(
+    # IdentityClient取得
+    client = get_identity_client()
+
+    logger.info("📝 ステップ1: Workload Access Token取得中...")
+
+    # Workload Access Tokenを取得（同期APIのため、イベントループを塞がないよう別スレッドで実行）
+    workload_access_token_response = await asyncio.to_thread(
+        client.get_workload_access_token,
         workload_name=WORKLOAD_NAME,
-        user_id=SHARED_USER_ID
+        user_id=SHARED_USER_ID,
     )
     workload_access_token = workload_access_token_response["workloadAccessToken"]
 
-    print("✅ Workload Access Token取得完了")
-
-    print("\n📝 ステップ2: OAuth2 Token取得中...")
-    print("   認証が必要な場合、URLが表示されます...\n")
+    logger.info("✅ Workload Access Token取得完了")
+    logger.info("📝 ステップ2: OAuth2 Token取得中...（認証が必要な場合、URLが表示されます）")
 
     try:
         # OAuth2 Tokenを取得
@@ -64,33 +99,41 @@ async def authenticate_google():
             provider_name=PROVIDER_NAME,
             agent_identity_token=workload_access_token,
             scopes=SCOPES,
+            # 認証URLは操作に必須のため、ログレベルに関係なく表示する
             on_auth_url=lambda url: print(f"\n🔗 認証URLをブラウザで開いてください:\n{url}\n"),
             auth_flow="USER_FEDERATION",
             callback_url=CALLBACK_URL,
-            force_authentication=True,
+            # 保存済みのトークン（期限切れならリフレッシュトークンで更新）を優先して使う
+            force_authentication=force,
         )
 
-        access_token = token_response.get("access_token")
-
-        if access_token:
-            print("\n✅ 認証成功！")
-            print(f"Access Token取得: {access_token[:50]}...")
-            print(f"\n認証情報が保存されました。")
-            print(f"User ID: {SHARED_USER_ID}")
-            print(f"以降、全LINEユーザーがこのGoogleアカウントのカレンダーを共有します。")
-            print("\n" + "=" * 70)
+        if token_response.get("access_token"):
+            logger.info(
+                "✅ 認証成功！認証情報が保存されました。(User ID: %s)\n"
+                "以降、全LINEユーザーがこのGoogleアカウントのカレンダーを共有します。\n%s",
+                SHARED_USER_ID,
+                SEPARATOR,
+            )
             return True
         else:
-            print("\n❌ Access Tokenが取得できませんでした")
+            logger.error("❌ Access Tokenが取得できませんでした")
             return False
 
-    except Exception as e:
-        print(f"\n❌ エラー: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("❌ Google認証に失敗しました")
         return False
 
 
 if __name__ == "__main__":
-    success = asyncio.run(authenticate_google())
+    parser = argparse.ArgumentParser(description="Google Calendar OAuth2 認証（共有カレンダー）")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="保存済みのトークンがあってもブラウザで再認証する",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    success = asyncio.run(authenticate_google(force=args.force))
     exit(0 if success else 1)
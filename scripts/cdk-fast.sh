@@ -0,0 +1,51 @@
+#!/usr/bin/env bash
+# cdk.out を再利用して CDK コマンドを実行するラッパー
+#
+# infra/ と functions/ のソースが前回の synth から変わっていなければ synth を省略し、
+# 既存の cdk.out をそのまま使う（cdk --app cdk.out）
+#
+# 使い方:
+#   scripts/cdk-fast.sh ls
+#   scripts/cdk-fast.sh deploy LineAgentWebhookStack --exclusively
+
+set -euo pipefail
+
+REPO_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+INFRA_DIR="${REPO_ROOT}/infra"
+HASH_FILE="${INFRA_DIR}/cdk.out/.source-hash"
+
+cd "${INFRA_DIR}"
+
+# context を指定した場合は synth 結果が変わるため、通常どおり実行する
+# （cdk.out が上書きされるので、次回の通常実行で再 synth させるためにハッシュを消す）
+for arg in "$@"; do
+  case "${arg}" in
+    -c | --context | --context=*)
+      rm -f "${HASH_FILE}"
+      exec cdk "$@"
+      ;;
+  esac
+done
+
+# synth 結果に影響するソースのハッシュ
+# （cdk.context.json と uv.lock は存在する場合のみ対象にする）
+hash_inputs=(infra/app.py infra/cdk.json infra/stacks functions)
+for optional_input in infra/cdk.context.json uv.lock; do
+  if [[ -e "${REPO_ROOT}/${optional_input}" ]]; then
+    hash_inputs+=("${optional_input}")
+  fi
+done
+
+source_hash="$(
+  cd "${REPO_ROOT}" &&
+    find "${hash_inputs[@]}" -type f \
+      ! -path '*/__pycache__/*' ! -name '*.py[cod]' -print0 |
+    sort -z | xargs -0 sha256sum | sha256sum | cut -d' ' -f1
+)"
+
+if [[ ! -f "${HASH_FILE}" || "$(cat "${HASH_FILE}")" != "${source_hash}" ]]; then
+  cdk synth --quiet
+  echo "${source_hash}" > "${HASH_FILE}"
+fi
+
+exec cdk --app cdk.out "$@"
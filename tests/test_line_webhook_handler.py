@@ -0,0 +1,123 @@
+"""
+LINE Webhook Handler のテスト
+"""
+
+import importlib
+import json
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+from unittest import mock
+
+import pytest
+
+LINE_WEBHOOK_DIR = Path(__file__).resolve().parents[1] / "functions" / "line_webhook"
+
+ERROR_REPLY = "申し訳ございません。エラーが発生しました。"
+
+AUTH_RESPONSE = (
+    "認証してください: https://accounts.google.com/o/oauth2/auth"
+    "?redirect_uri=https%3A%2F%2Fexample.com%2Fcallback%3Fsession_id%3Dsession-123"
+)
+
+
+@pytest.fixture
+def handler(monkeypatch: pytest.MonkeyPatch) -> Iterator[ModuleType]:
+    """
+    AWSクライアントをモックしてLINE Webhook Handlerを読み込む
+    """
+    monkeypatch.setenv("LINE_SECRET_ARN", "arn:aws:secretsmanager:ap-northeast-1:123:secret:line")
+    monkeypatch.setenv(
+        "AGENT_RUNTIME_ARN", "arn:aws:bedrock-agentcore:ap-northeast-1:123:runtime/test"
+    )
+    monkeypatch.setenv("COGNITO_USER_POOL_ID", "ap-northeast-1_test")
+    monkeypatch.setenv("COGNITO_APP_CLIENT_ID", "test-client")
+    monkeypatch.syspath_prepend(str(LINE_WEBHOOK_DIR))
+
+    aws_client = mock.MagicMock()
+    aws_client.get_secret_value.return_value = {
+        "SecretString": json.dumps(
+            {"channel_access_token": "test-token", "channel_secret": "test-secret"}
+        )
+    }
+
+    for name in ("handler", "cognito_auth"):
+        sys.modules.pop(name, None)
+    with (
+        mock.patch("boto3.client", return_value=aws_client),
+        mock.patch("requests.Session.head"),
+    ):
+        module = importlib.import_module("handler")
+        # 起動時の接続準備がモックを外す前に終わるよう待つ
+        module.background_executor.submit(lambda: None).result()
+
+    monkeypatch.setattr(module, "dynamodb", mock.MagicMock())
+    monkeypatch.setattr(module, "runtime_http", mock.MagicMock())
+    monkeypatch.setattr(module, "get_jwt_token_simple", mock.MagicMock(return_value="jwt-token"))
+    monkeypatch.setattr(module, "reply_text", mock.MagicMock())
+
+    yield module
+
+    for name in ("handler", "cognito_auth"):
+        sys.modules.pop(name, None)
+
+
+def text_event(user_id: str, text: str = "予定を教えて") -> dict:
+    """
+    テキストメッセージのWebhookイベントを作る
+    """
+    return {
+        "type": "message",
+        "replyToken": f"reply-{user_id}",
+        "source": {"type": "user", "userId": user_id},
+        "message": {"type": "text", "text": text},
+    }
+
+
+def runtime_response(text: str) -> mock.MagicMock:
+    """
+    AgentCore Runtimeの正常応答を作る
+    """
+    response = mock.MagicMock(status_code=200)
+    response.json.return_value = {"response": text}
+    return response
+
+
+def test_auth_url_is_sent_after_oauth_session_is_stored(handler: ModuleType) -> None:
+    handler.runtime_http.post.return_value = runtime_response(AUTH_RESPONSE)
+    calls = mock.MagicMock()
+    calls.attach_mock(handler.dynamodb.put_item, "put_item")
+    calls.attach_mock(handler.reply_text, "reply_text")
+
+    handler.handle_text_message(text_event("U1"))
+
+    assert [call[0] for call in calls.mock_calls] == ["put_item", "reply_text"]
+    item = handler.dynamodb.put_item.call_args.kwargs["Item"]
+    assert item["session_id"] == {"S": "session-123"}
+    assert item["line_user_id"] == {"S": "U1"}
+    assert "https://accounts.google.com/" in handler.reply_text.call_args.args[1]
+
+
+def test_auth_url_is_not_sent_when_oauth_session_store_fails(handler: ModuleType) -> None:
+    handler.runtime_http.post.return_value = runtime_response(AUTH_RESPONSE)
+    handler.dynamodb.put_item.side_effect = RuntimeError("DynamoDB unavailable")
+
+    handler.handle_text_message(text_event("U1"))
+
+    handler.reply_text.assert_called_once_with("reply-U1", ERROR_REPLY)
+
+
+def test_text_message_without_user_id_is_skipped(handler: ModuleType) -> None:
+    handler.runtime_http.post.return_value = runtime_response("了解しました")
+    group_event = text_event("U1")
+    group_event["source"] = {"type": "group", "groupId": "G1"}
+    body = json.dumps({"events": [group_event, text_event("U2")]})
+
+    with mock.patch.object(handler, "verify_signature", return_value=True):
+        result = handler.lambda_handler(
+            {"headers": {"x-line-signature": "signature"}, "body": body}, None
+        )
+
+    assert result["statusCode"] == 200
+    handler.reply_text.assert_called_once_with("reply-U2", "了解しました")